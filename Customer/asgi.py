@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Customer.settings')
+# Serve the async customer views (see Customer.asgi_urls).
+os.environ.setdefault('CUSTOMER_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
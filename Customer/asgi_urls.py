@@ -0,0 +1,17 @@
+"""
+URL configuration used under ASGI (``CUSTOMER_ASYNC_VIEWS=1``).
+
+Identical to ``Customer.urls`` except that the customer read paths and the
+upload receiver are served by the async views in ``customer_app.async_views``.
+"""
+from django.contrib import admin
+from django.urls import path,include
+from django.conf import settings
+from django.conf.urls.static import static
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('',include('customer_app.async_urls'))
+]
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -43,12 +43,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'customer_app.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'customer_app.middleware.ReplicaRoutingMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -82,6 +84,46 @@ DATABASES = {
     }
 }
 
+# Select the tuned SQLite profile with DJANGO_DB_PROFILE=production. It
+# keeps connections open between requests and sets the pragmas below on
+# every new connection (see customer_app.db): WAL lets list pages keep
+# reading while an import writes, and synchronous=NORMAL is safe under WAL.
+
+DATABASE_PROFILE = os.environ.get('DJANGO_DB_PROFILE', 'development')
+SQLITE_PRAGMAS = {}
+
+if DATABASE_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    })
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64 * 1024,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'journal_size_limit': 64 * 1024 * 1024,
+    }
+
+# Read replicas. DJANGO_DB_REPLICAS=N adds aliases replica1..replicaN, local
+# SQLite copies of the primary refreshed by `manage.py sync_replicas`.
+# Customer reads from views marked @replica_reads go to a random replica,
+# except for browsers that wrote in the last DATABASE_REPLICA_PIN_SECONDS.
+
+DATABASE_REPLICAS = []
+for _n in range(1, int(os.environ.get('DJANGO_DB_REPLICAS', '0')) + 1):
+    DATABASES[f'replica{_n}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db.replica{_n}.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{_n}')
+
+DATABASE_ROUTERS = ['customer_app.routers.ReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,4 +170,122 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'customer_list'
-LOGOUT_REDIRECT_URL = 'login'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'login'
+
+# Customer bulk import
+# Rows are streamed from the workbook and written with bulk_create in
+# batches of this size, one transaction per batch.
+
+CUSTOMER_IMPORT_BATCH_SIZE = 1000
+
+# Uploads are stored and imported by a local thread pool of this many
+# workers, and deleted once imported. Set CUSTOMER_IMPORT_ASYNC to False to
+# import inside the request. The pool does not survive a restart: on the
+# first request each process fails pending or running jobs that have not
+# reported progress for CUSTOMER_IMPORT_STALE_SECONDS.
+
+CUSTOMER_IMPORT_WORKERS = 2
+CUSTOMER_IMPORT_ASYNC = True
+CUSTOMER_IMPORT_STALE_SECONDS = 15 * 60
+
+# Customer list pagination. Pages are fetched with keyset cursors on
+# (created_at, id); ?page_size= may override the default up to the maximum.
+
+CUSTOMER_LIST_PAGE_SIZE = 50
+CUSTOMER_LIST_MAX_PAGE_SIZE = 500
+
+# Customers PDF report. With more than one worker the report is laid out
+# in chunks of CUSTOMER_PDF_CHUNK_SIZE across a process pool and merged
+# (requires pypdf); otherwise it is rendered serially. Either way the
+# finished pages are held in memory until the document is written, and the
+# merge needs more per page, so reports of more than
+# CUSTOMER_PDF_PARALLEL_MAX_RECORDS customers are always rendered serially.
+
+CUSTOMER_PDF_WORKERS = 0
+CUSTOMER_PDF_CHUNK_SIZE = 500
+CUSTOMER_PDF_PARALLEL_MAX_RECORDS = 20000
+
+# Customer image thumbnails (longest side in pixels), generated on upload
+# under MEDIA_ROOT/thumbs/ and keyed by the image's content hash.
+
+CUSTOMER_THUMBNAIL_SIZES = {
+    'avatar': 40,
+    'pdf': 80,
+    'profile': 100,
+    'detail': 200,
+}
+
+# Uploaded customer images are rotated upright, scaled to at most
+# CUSTOMER_IMAGE_MAX_SIZE pixels on the longest side, stripped of metadata
+# and re-encoded (JPEG, or PNG when transparent), with a WebP copy beside
+# each stored file.
+
+CUSTOMER_IMAGE_MAX_SIZE = 1600
+CUSTOMER_IMAGE_QUALITY = 85
+CUSTOMER_IMAGE_WEBP_QUALITY = 80
+
+# Rendered customer profile PDFs, keyed by pk and updated_at. The least
+# recently used files are evicted once the directory exceeds the cap.
+
+CUSTOMER_PDF_CACHE_DIR = BASE_DIR / 'cache' / 'customer_pdfs'
+CUSTOMER_PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Request metrics, exposed in Prometheus text format at /metrics. Requests
+# slower than METRICS_SLOW_REQUEST_SECONDS (None disables) are logged with
+# their most expensive queries. Outside DEBUG /metrics is only served when
+# METRICS_TOKEN is set, and then requires it as a bearer token.
+
+METRICS_SLOW_REQUEST_SECONDS = 1.0
+METRICS_SLOW_REQUEST_TOP_QUERIES = 5
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Customer change feed (/customers/changes/). Changes younger than the lag
+# are held back so a transaction that commits late cannot slip behind a
+# consumer's cursor.
+
+CUSTOMER_CHANGES_PAGE_SIZE = 500
+CUSTOMER_CHANGES_MAX_PAGE_SIZE = 5000
+CUSTOMER_CHANGES_LAG_SECONDS = 2
+
+# Caches. Rendered customer list rows are cached in template_fragments,
+# keyed by pk and updated_at, so an edited customer never shows a stale row
+# and entries only need a timeout to bound memory.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+CUSTOMER_ROW_CACHE_SECONDS = 24 * 60 * 60
+
+# Django wraps the default loaders in the cached loader on its own; spell it
+# out outside DEBUG so production keeps compiled templates in memory even if
+# more loaders are added later.
+
+if not DEBUG:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+# Async views (served with Customer.asgi). CPU-heavy work such as PDF
+# rendering runs on a pool of this many threads so the event loop and the
+# thread that runs ORM calls stay free for other connections.
+
+CUSTOMER_ASYNC_VIEWS = os.environ.get('CUSTOMER_ASYNC_VIEWS') == '1'
+CUSTOMER_BLOCKING_WORKERS = 4
+ROOT_URLCONF = 'Customer.asgi_urls' if CUSTOMER_ASYNC_VIEWS else 'Customer.urls'
+
+# Bulk actions on the customer list delete or update the selected customers
+# this many at a time, each chunk in its own transaction.
+
+CUSTOMER_BULK_CHUNK_SIZE = 500
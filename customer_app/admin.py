@@ -1,4 +1,78 @@
-from django.contrib import admin
-from .models import Customer
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 
-admin.site.register(Customer)
\ No newline at end of file
+from .bulk import bulk_delete_customers
+from .changes import record_deletions
+from .duplicates import find_duplicate_clusters, merge_clusters
+from .forms import CustomerForm
+from .models import Customer, GeographySummary, ImportJob
+
+DUPLICATE_CLUSTERS_SHOWN = 200
+
+
+@admin.register(Customer)
+class CustomerAdmin(admin.ModelAdmin):
+    form = CustomerForm
+    change_list_template = 'admin/customer_app/customer/change_list.html'
+
+    def delete_model(self, request, obj):
+        record_deletions([obj.pk])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        bulk_delete_customers(queryset.values_list('pk', flat=True))
+
+    def get_urls(self):
+        return [
+            path('duplicates/', self.admin_site.admin_view(self.duplicates_view),
+                 name='customer_app_customer_duplicates'),
+        ] + super().get_urls()
+
+    def duplicates_view(self, request):
+        if request.method == 'POST':
+            if not self.has_delete_permission(request):
+                messages.error(request, 'You do not have permission to merge customers.')
+                return redirect('admin:customer_app_customer_duplicates')
+            posted = [
+                sorted({int(pk) for pk in value.split(',') if pk.isdigit()})
+                for value in request.POST.getlist('cluster')
+            ]
+            posted = [c for c in posted if len(c) > 1]
+            # The form may be stale or edited: only merge clusters that the
+            # matcher still produces from the posted customers.
+            current = find_duplicate_clusters(Customer.objects.filter(pk__in=[pk for c in posted for pk in c]))
+            clusters = [c for c in posted if c in current]
+            merged = merge_clusters(clusters)
+            messages.success(request, f'Merged {len(clusters)} clusters, removing {merged} duplicate customers.')
+            if len(clusters) < len(posted):
+                messages.warning(request, f'Skipped {len(posted) - len(clusters)} clusters that no longer match; '
+                                          'review them again.')
+            return redirect('admin:customer_app_customer_duplicates')
+
+        clusters = find_duplicate_clusters()
+        shown = clusters[:DUPLICATE_CLUSTERS_SHOWN]
+        customers = Customer.objects.select_related('city').in_bulk([pk for cluster in shown for pk in cluster])
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Duplicate customers',
+            'cluster_count': len(clusters),
+            'clusters': [
+                {'key': ','.join(map(str, cluster)), 'customers': [customers[pk] for pk in cluster if pk in customers]}
+                for cluster in shown
+            ],
+        }
+        return TemplateResponse(request, 'admin/customer_app/customer/duplicates.html', context)
+
+
+admin.site.register(ImportJob)
+
+
+@admin.register(GeographySummary)
+class GeographySummaryAdmin(admin.ModelAdmin):
+    list_display = ['country', 'state', 'city', 'customers']
+    list_filter = ['country']
+    list_select_related = True
+    search_fields = ['country__name', 'state__name', 'city__name']
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class CustomerAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customer_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .db import configure_sqlite_connection
+        from .jobs import fail_abandoned_jobs_on_first_request
+        from .middleware import install_query_recorder
+        from .search import ensure_search_triggers
+
+        post_migrate.connect(ensure_search_triggers, sender=self)
+        connection_created.connect(configure_sqlite_connection)
+        connection_created.connect(install_query_recorder)
+        request_started.connect(fail_abandoned_jobs_on_first_request)
@@ -0,0 +1,21 @@
+from django.urls import path
+
+from . import async_views, urls
+
+ASYNC_VIEWS = {
+    'customer_list': async_views.customer_list,
+    'customer_search': async_views.customer_search,
+    'customer_changes': async_views.customer_changes_feed,
+    'customer_detail': async_views.customer_detail,
+    'customer_bulk_upload': async_views.customer_bulk_upload,
+    'import_job_status': async_views.import_job_status,
+    'download_customers_pdf': async_views.download_customers_pdf,
+    'download_customer_pdf_individual': async_views.download_customer_pdf_individual,
+}
+
+# Same routes and names as ``customer_app.urls``, with the async views
+# swapped in; everything else stays sync.
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS.get(pattern.name, pattern.callback), name=pattern.name)
+    for pattern in urls.urlpatterns
+]
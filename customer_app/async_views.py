@@ -0,0 +1,199 @@
+"""Async versions of the customer read paths and the upload receiver.
+
+Served by ``Customer.asgi_urls`` (``CUSTOMER_ASYNC_VIEWS=1``, the default
+under ASGI). They share their helpers with ``views`` and behave the same;
+database reads use the async ORM, rendering goes through ``sync_to_async``
+and PDF building runs on the ``run_blocking`` pool so it does not hold up
+the event loop.
+"""
+from calendar import timegm
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import redirect, render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import views
+from .changes import customer_changes
+from .forms import ExcelUploadForm
+from .jobs import enqueue_import, run_blocking
+from .locations import LOCATION_FIELDS
+from .models import Customer, ImportJob
+from .pagination import KeysetPage, akeyset_paginate
+from .pdf_cache import cached_profile_pdf
+from .routers import replica_reads
+from .search import search_customers
+
+
+def async_login_required(view):
+    """``login_required`` for async views (Django 4.2 has no async variant)."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if await sync_to_async(lambda: request.user.is_authenticated)():
+            return await view(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path())
+    return wrapper
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """``condition`` for async views; the validators run via ``sync_to_async``."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            etag = last_modified = None
+            if request.method in ('GET', 'HEAD'):
+                if etag_func:
+                    etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+                    etag = quote_etag(etag) if etag else None
+                if last_modified_func:
+                    modified = await sync_to_async(last_modified_func)(request, *args, **kwargs)
+                    last_modified = timegm(modified.utctimetuple()) if modified else None
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response:
+                    return response
+            response = await view(request, *args, **kwargs)
+            if etag and not response.has_header('ETag'):
+                response.headers['ETag'] = etag
+            if last_modified and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def private_no_cache(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        response = await view(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
+
+
+async def customer_page(request):
+    page_size = views.list_page_size(request)
+    query = request.GET.get('q', '').strip()
+    if query:
+        items = await sync_to_async(search_customers)(query, limit=page_size)
+        return KeysetPage(items=items, page_size=page_size)
+    try:
+        return await akeyset_paginate(Customer.objects.all(), page_size,
+                                      after=request.GET.get('after'), before=request.GET.get('before'))
+    except ValueError:
+        return await akeyset_paginate(Customer.objects.all(), page_size)
+
+
+async def recent_import_jobs(request):
+    user = await sync_to_async(lambda: request.user)()
+    return [job async for job in views.recent_import_jobs(user)]
+
+
+@async_login_required
+@replica_reads
+@private_no_cache
+@async_condition(etag_func=views.customer_list_etag)
+async def customer_list(request):
+    try:
+        page = await customer_page(request)
+        context = views.customer_list_context(page, await recent_import_jobs(request))
+        return await sync_to_async(render)(request, 'customer_list.html', context)
+    except Exception as e:
+        return await sync_to_async(render)(request, 'customer_list.html', {'customers': [], 'error': f"Error: {e}"})
+
+
+@async_login_required
+@replica_reads
+async def customer_search(request):
+    try:
+        customers = await sync_to_async(search_customers)(request.GET.get('q', ''), limit=views.search_limit(request))
+        return JsonResponse({'results': [views.search_result(c) for c in customers]})
+    except Exception as e:
+        return JsonResponse({'error': f"Error searching customers: {e}"}, status=500)
+
+
+@async_login_required
+@replica_reads
+@private_no_cache
+@async_condition(etag_func=views.customer_detail_etag)
+async def customer_detail(request, pk):
+    try:
+        customer = await Customer.objects.select_related(*LOCATION_FIELDS).aget(pk=pk)
+        return await sync_to_async(render)(request, 'customer_detail.html', {'customer': customer})
+    except Exception as e:
+        raise Http404(f"Error loading customer: {e}")
+
+
+@async_login_required
+async def customer_bulk_upload(request):
+    try:
+        message = ''
+        if request.method == 'POST':
+            form = ExcelUploadForm(request.POST, request.FILES)
+            if form.is_valid():
+                user = await sync_to_async(lambda: request.user)()
+                job = await ImportJob.objects.acreate(
+                    file=request.FILES['excel_file'], mode=form.cleaned_data['mode'] or ImportJob.MODE_INSERT,
+                    created_by=user)
+                # The import itself runs on the import worker pool.
+                await sync_to_async(enqueue_import)(job)
+                messages.info(request, f'Import #{job.pk} queued. Progress is shown below.')
+                return redirect('customer_list')
+        else:
+            form = ExcelUploadForm()
+        page = await customer_page(request)
+        context = views.customer_list_context(
+            page, await recent_import_jobs(request), bulk_form=form, message=message)
+        return await sync_to_async(render)(request, 'customer_list.html', context)
+    except Exception as e:
+        return HttpResponse(f"Error bulk uploading customers: {e}", status=500)
+
+
+@async_login_required
+@replica_reads
+async def customer_changes_feed(request):
+    try:
+        page = await sync_to_async(customer_changes)(request.GET.get('cursor'), views.changes_page_size(request))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': f"Error reading customer changes: {e}"}, status=500)
+    return views.changes_response(page)
+
+
+@async_login_required
+async def import_job_status(request, pk):
+    user = await sync_to_async(lambda: request.user)()
+    try:
+        job = await views.visible_import_jobs(user).aget(pk=pk)
+    except ImportJob.DoesNotExist:
+        raise Http404('No ImportJob matches the given query.')
+    return JsonResponse(job.as_dict())
+
+
+@async_login_required
+@replica_reads
+async def download_customers_pdf(request):
+    try:
+        return views.customers_pdf_response(await run_blocking(views.spool_customers_pdf))
+    except Exception as e:
+        return HttpResponse(f"Error generating customers PDF: {e}", status=500)
+
+
+@async_login_required
+@replica_reads
+@async_condition(etag_func=views.customer_pdf_etag, last_modified_func=views.customer_updated_at)
+async def download_customer_pdf_individual(request, pk):
+    try:
+        try:
+            customer = await Customer.objects.select_related(*LOCATION_FIELDS).aget(pk=pk)
+        except Customer.DoesNotExist:
+            raise Http404('No Customer matches the given query.')
+        return views.customer_pdf_response(customer, await run_blocking(cached_profile_pdf, customer))
+    except Http404:
+        raise
+    except Exception as e:
+        return HttpResponse(f"Error generating customer PDF: {e}", status=500)
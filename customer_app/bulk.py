@@ -0,0 +1,98 @@
+"""Delete or update many customers with set-based statements.
+
+``Model.delete()`` and ``save()`` run the per-customer signal receivers
+(image references, thumbnails, cached PDFs, the geography summary) once per
+row. These functions issue one DELETE or UPDATE per chunk and do the same
+bookkeeping for the whole chunk at once.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .changes import record_deletions
+from .geography import GEOGRAPHY_COLUMNS, apply_geography_deltas
+from .locations import LOCATION_FIELDS, location_ids
+from .models import Customer
+from .pdf_cache import invalidate_many as invalidate_profile_pdfs
+from .thumbnails import delete_thumbnails
+
+BULK_UPDATE_FIELDS = LOCATION_FIELDS
+
+
+def chunked(ids, chunk_size=None):
+    ids = list(ids)
+    chunk_size = chunk_size or settings.CUSTOMER_BULK_CHUNK_SIZE
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def release_thumbnails(hashes):
+    """Delete the thumbnails of ``hashes`` no customer uses any more."""
+    still_used = set(Customer.objects.filter(image_hash__in=hashes).values_list('image_hash', flat=True))
+    for image_hash in set(hashes) - still_used:
+        delete_thumbnails(image_hash)
+
+
+def bulk_delete_customers(ids, chunk_size=None):
+    """Delete the customers in ``ids`` and release what they reference.
+
+    Returns the number of customers deleted.
+    """
+    storage = Customer._meta.get_field('image').storage
+    deleted = 0
+    for chunk in chunked(ids, chunk_size):
+        with transaction.atomic():
+            rows = list(Customer.objects.filter(pk__in=chunk)
+                        .values_list('pk', 'image', 'image_hash', *GEOGRAPHY_COLUMNS))
+            if not rows:
+                continue
+            pks = [row[0] for row in rows]
+            record_deletions(pks)
+            # QuerySet.delete() would load each customer to send post_delete;
+            # what the receivers do is done below, once per chunk. _raw_delete
+            # is private Django API (one DELETE, no signals, no cascade --
+            # nothing references Customer); BulkActionTests pin that down.
+            customers = Customer.objects.filter(pk__in=pks)
+            deleted += customers._raw_delete(customers.db)
+
+            deltas = Counter()
+            for row in rows:
+                deltas[tuple(row[3:])] -= 1
+            apply_geography_deltas(deltas)
+            # Files are only unlinked once the chunk commits, so if anything
+            # here fails the rollback leaves customers whose images exist.
+            for name, references in Counter(row[1] for row in rows if row[1]).items():
+                storage.release_on_commit(name, references)
+            hashes = {row[2] for row in rows if row[2]}
+            transaction.on_commit(lambda hashes=hashes: release_thumbnails(hashes))
+        invalidate_profile_pdfs(pks)
+    return deleted
+
+
+def bulk_update_customers(ids, field, value, chunk_size=None):
+    """Set location ``field`` of the customers in ``ids`` to the name ``value``.
+
+    A blank ``value`` clears the field. Customers that already have the value
+    are left alone. Returns the number of customers changed.
+    """
+    if field not in BULK_UPDATE_FIELDS:
+        raise ValueError(f'{field} cannot be updated in bulk')
+    column = f'{field}_id'
+    position = GEOGRAPHY_COLUMNS.index(column)
+    location = location_ids(Customer._meta.get_field(field).related_model, [value]).get(value)
+    updated = 0
+    for chunk in chunked(ids, chunk_size):
+        with transaction.atomic():
+            customers = Customer.objects.filter(pk__in=chunk).exclude(**{column: location})
+            deltas = Counter()
+            for row in customers.order_by().values_list(*GEOGRAPHY_COLUMNS).annotate(n=Count('id')):
+                before, n = row[:-1], row[-1]
+                deltas[before] -= n
+                deltas[before[:position] + (location,) + before[position + 1:]] += n
+            updated += customers.update(**{column: location, 'updated_at': timezone.now()})
+            apply_geography_deltas(deltas)
+        invalidate_profile_pdfs(chunk)
+    return updated
@@ -0,0 +1,90 @@
+import base64
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .locations import location_columns
+from .models import Customer, CustomerTombstone
+
+CHANGE_FIELDS = ['id', 'first_name', 'last_name', 'email', 'phone', 'city', 'state', 'country',
+                 'created_at', 'updated_at']
+
+
+@dataclass
+class ChangePage:
+    changed: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+    cursor: Optional[str] = None
+    has_more: bool = False
+
+
+def record_deletions(customer_ids):
+    """Write one tombstone per deleted customer id.
+
+    Call this wherever customers are deleted so the change feed can pass
+    the deletions on.
+    """
+    now = timezone.now()
+    CustomerTombstone.objects.bulk_create(
+        [CustomerTombstone(customer_id=pk, deleted_at=now) for pk in customer_ids], batch_size=1000)
+
+
+def encode_change_cursor(updated_at, pk, tombstone_id):
+    raw = f"{updated_at.isoformat() if updated_at else ''}|{pk}|{tombstone_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_change_cursor(cursor):
+    """Return ``(updated_at, pk, tombstone_id)``; ``updated_at`` is None before the first change.
+
+    Raises ``ValueError`` for anything ``encode_change_cursor`` did not produce.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        updated_at, pk, tombstone_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return (datetime.fromisoformat(updated_at) if updated_at else None), int(pk), int(tombstone_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f'Invalid cursor: {cursor!r}') from e
+
+
+def customer_changes(cursor=None, limit=500):
+    """Return the customers changed and deleted since ``cursor``.
+
+    Customers are read in ``(updated_at, id)`` order from the
+    ``customer_updated_id_idx`` index and tombstones in id order, so a page
+    costs O(limit) however large the table is. Without a cursor the feed
+    starts with every customer and only deletions from now on. Rows newer
+    than ``CUSTOMER_CHANGES_LAG_SECONDS`` are held back, since a transaction
+    that is still open may commit a slightly older ``updated_at`` later.
+    """
+    if cursor:
+        updated_at, pk, tombstone_id = decode_change_cursor(cursor)
+    else:
+        updated_at, pk = None, 0
+        tombstone_id = CustomerTombstone.objects.aggregate(last=Max('id'))['last'] or 0
+
+    customers = Customer.objects.filter(
+        updated_at__lte=timezone.now() - timedelta(seconds=settings.CUSTOMER_CHANGES_LAG_SECONDS))
+    if updated_at:
+        customers = customers.filter(updated_at__gte=updated_at).exclude(updated_at=updated_at, id__lte=pk)
+    changed = [dict(zip(CHANGE_FIELDS, row)) for row in customers.order_by('updated_at', 'id')
+               .values_list(*location_columns(CHANGE_FIELDS))[:limit + 1]]
+    deleted = list(CustomerTombstone.objects.filter(id__gt=tombstone_id).order_by('id')
+                   .values('id', 'customer_id', 'deleted_at')[:limit + 1])
+
+    has_more = len(changed) > limit or len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+    if changed:
+        updated_at, pk = changed[-1]['updated_at'], changed[-1]['id']
+    if deleted:
+        tombstone_id = deleted[-1]['id']
+    return ChangePage(
+        changed=changed,
+        deleted=[{'id': row['customer_id'], 'deleted_at': row['deleted_at']} for row in deleted],
+        cursor=encode_change_cursor(updated_at, pk, tombstone_id),
+        has_more=has_more,
+    )
@@ -0,0 +1,47 @@
+import sqlite3
+from contextlib import closing, contextmanager
+
+from django.conf import settings
+from django.test.utils import (setup_databases, setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Apply ``SQLITE_PRAGMAS`` to each new SQLite connection.
+
+    ``journal_mode`` is stored in the database file, the rest only last for
+    the connection, which is why this runs on ``connection_created``.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def copy_sqlite_database(source, target):
+    """Copy the SQLite database at ``source`` into ``target`` page by page.
+
+    Uses SQLite's online backup API, so the source stays readable and
+    writable during the copy and readers of ``target`` never see a half
+    written file.
+    """
+    with closing(sqlite3.connect(source)) as src, closing(sqlite3.connect(target)) as dst:
+        src.backup(dst)
+
+
+@contextmanager
+def throwaway_databases():
+    """Run the block against fresh test databases for every alias.
+
+    Replicas are set up as test mirrors of ``default`` (their ``TEST``
+    settings), so views reading from a replica see the throwaway data
+    rather than the real replica files.
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
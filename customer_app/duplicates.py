@@ -0,0 +1,162 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.db import transaction
+from django.utils import timezone
+
+from .changes import record_deletions
+from .geography import batched_geography_updates, geography_key, record_geography_change
+from .locations import location_columns
+from .models import Customer
+
+# Blocks larger than this come from keys too common to tell customers apart
+# (e.g. an empty-ish local part like "info"); comparing inside them would
+# bring back the quadratic cost, so they are skipped.
+MAX_BLOCK_SIZE = 200
+MERGE_FIELDS = ['first_name', 'last_name', 'email', 'phone', 'city_id', 'state_id', 'country_id']
+RECORD_FIELDS = ['id', 'first_name', 'last_name', 'email', 'phone', 'city']
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def soundex(name):
+    letters = re.sub(r'[^a-z]', '', (name or '').lower())
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+        if letter not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def phone_key(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:] if len(digits) >= 7 else ''
+
+
+def email_local_part(email):
+    local = (email or '').lower().split('@')[0]
+    return local.split('+')[0].replace('.', '')
+
+
+def full_name(record):
+    return f"{record['first_name']} {record['last_name']}".strip().lower()
+
+
+def blocking_keys(record):
+    keys = []
+    phone = phone_key(record['phone'])
+    if phone:
+        keys.append(('phone', phone))
+    local = email_local_part(record['email'])
+    if local:
+        keys.append(('email', local))
+    surname = soundex(record['last_name'] or record['first_name'])
+    if surname:
+        keys.append(('name', surname, record['first_name'][:1].lower(), record['city'].strip().lower()))
+    return keys
+
+
+def name_similarity(a, b):
+    return SequenceMatcher(None, full_name(a), full_name(b)).ratio()
+
+
+def is_duplicate(kind, a, b):
+    if kind == 'phone':
+        return name_similarity(a, b) >= 0.6
+    if kind == 'email':
+        return a['email'].lower() == b['email'].lower() or name_similarity(a, b) >= 0.8
+    return name_similarity(a, b) >= 0.85
+
+
+def find_duplicate_clusters(queryset=None):
+    """Return clusters of likely-duplicate customer ids, largest first.
+
+    Customers are grouped into blocks by normalized phone, email local part
+    and (phonetic surname, first initial, city); only customers sharing a
+    block are compared, so the cost grows with the block sizes rather than
+    with every pair in the table. Matches are joined transitively.
+    """
+    queryset = Customer.objects.all() if queryset is None else queryset
+    records = {}
+    blocks = defaultdict(list)
+    for values in queryset.values_list(*location_columns(RECORD_FIELDS)).iterator(chunk_size=2000):
+        record = dict(zip(RECORD_FIELDS, values))
+        records[record['id']] = record
+        for key in blocking_keys(record):
+            blocks[key].append(record['id'])
+
+    parent = {}
+
+    def find(pk):
+        root = pk
+        while parent.get(root, root) != root:
+            root = parent[root]
+        parent[pk] = root
+        return root
+
+    for key, ids in blocks.items():
+        if len(ids) < 2 or len(ids) > MAX_BLOCK_SIZE:
+            continue
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:]:
+                if find(a) != find(b) and is_duplicate(key[0], records[a], records[b]):
+                    parent[find(b)] = find(a)
+
+    clusters = defaultdict(list)
+    for pk in parent:
+        clusters[find(pk)].append(pk)
+    return sorted((sorted(ids) for ids in clusters.values() if len(ids) > 1), key=len, reverse=True)
+
+
+def merge_clusters(clusters):
+    """Merge each cluster into its oldest customer and delete the others.
+
+    Blank fields on the survivor are filled from the other records in id
+    order. Survivors are written with one ``bulk_update`` and the merged
+    records removed with one ``delete()``. Returns the number of customers
+    deleted.
+    """
+    ids = [pk for cluster in clusters for pk in cluster]
+    customers = Customer.objects.in_bulk(ids)
+    now = timezone.now()
+    survivors, losers, shared_images, moves = [], [], [], []
+    for cluster in clusters:
+        members = [customers[pk] for pk in sorted(cluster) if pk in customers]
+        if len(members) < 2:
+            continue
+        survivor, others = members[0], members[1:]
+        location = geography_key(survivor)
+        for other in others:
+            for name in MERGE_FIELDS:
+                if not getattr(survivor, name) and getattr(other, name):
+                    setattr(survivor, name, getattr(other, name))
+            if not survivor.image and other.image:
+                survivor.image, survivor.image_hash = other.image.name, other.image_hash
+                shared_images.append(other.image.name)
+        survivor.updated_at = now
+        moves.append((location, geography_key(survivor)))
+        survivors.append(survivor)
+        losers.extend(other.pk for other in others)
+
+    storage = Customer._meta.get_field('image').storage
+    with transaction.atomic(), batched_geography_updates():
+        Customer.objects.bulk_update(survivors, MERGE_FIELDS + ['image', 'image_hash', 'updated_at'])
+        for before, after in moves:
+            record_geography_change(before, after)
+        # Survivors now also reference these images; take the reference
+        # before deleting the old owners releases theirs.
+        for name in shared_images:
+            storage.acquire(name)
+        record_deletions(losers)
+        Customer.objects.filter(pk__in=losers).delete()
+    return len(losers)
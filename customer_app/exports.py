@@ -0,0 +1,44 @@
+import csv
+from datetime import datetime
+
+from openpyxl import Workbook
+
+from .locations import location_columns
+
+EXPORT_FIELDS = ['id', 'first_name', 'last_name', 'email', 'phone', 'city', 'state', 'country',
+                 'created_at', 'updated_at']
+EXPORT_HEADER = ['ID', 'First Name', 'Last Name', 'Email', 'Phone', 'City', 'State', 'Country',
+                 'Created At', 'Updated At']
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Yield the export columns of ``queryset`` as tuples, one row at a time."""
+    return queryset.values_list(*location_columns(EXPORT_FIELDS)).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_chunks(rows):
+    """Yield CSV text for ``rows``, one encoded line per item."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in rows:
+        yield writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+
+
+def write_xlsx(rows, file):
+    """Write ``rows`` to ``file`` with a write-only workbook.
+
+    openpyxl spools write-only sheets to disk, so memory does not grow with
+    the number of rows. Excel has no time zones; datetimes are written as
+    naive UTC.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Customers')
+    sheet.append(EXPORT_HEADER)
+    for row in rows:
+        sheet.append([value.replace(tzinfo=None) if isinstance(value, datetime) else value for value in row])
+    workbook.save(file)
@@ -1,5 +1,8 @@
 from django import forms
-from .models import Customer
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from .images import optimize_upload
+from .models import Customer, ImportJob
 from django.contrib.auth.models import User
 
 
@@ -8,9 +11,46 @@ class CustomerForm(forms.ModelForm):
         model = Customer
         fields = ['first_name', 'last_name', 'email', 'phone', 'city', 'state', 'country', 'image']
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            return optimize_upload(image)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            raise forms.ValidationError('Could not read this image; upload a JPEG, PNG or WebP file.')
+
+
 class ExcelUploadForm(forms.Form):
     excel_file = forms.FileField()
+    mode = forms.ChoiceField(choices=ImportJob.MODE_CHOICES, initial=ImportJob.MODE_INSERT, required=False)
+
+
+class CustomerBulkActionForm(forms.Form):
+    ACTION_CHOICES = [
+        ('delete', 'Delete'),
+        ('update', 'Set field'),
+        ('pdf', 'Download PDF'),
+    ]
+    FIELD_CHOICES = [('city', 'City'), ('state', 'State'), ('country', 'Country')]
+
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    field = forms.ChoiceField(choices=FIELD_CHOICES, required=False)
+    value = forms.CharField(max_length=100, required=False, strip=True)
+    all_matching = forms.BooleanField(required=False)
+
+    def __init__(self, *args, query='', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query = query
 
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('action') == 'update' and not cleaned_data.get('field'):
+            raise forms.ValidationError('Choose the field to set.')
+        # Without a search "all matching" would mean every customer.
+        if cleaned_data.get('all_matching') and not self.query:
+            raise forms.ValidationError('Search first to act on all matching customers.')
+        return cleaned_data
 
 
 class UserForm(forms.ModelForm):
@@ -0,0 +1,124 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Customer, GeographySummary
+
+GEOGRAPHY_FIELDS = ['country', 'state', 'city']
+GEOGRAPHY_COLUMNS = ['country_id', 'state_id', 'city_id']
+
+_pending = ContextVar('customer_geography_pending', default=None)
+
+UNSET = object()
+
+
+def geography_key(customer):
+    return (customer.country_id, customer.state_id, customer.city_id)
+
+
+def apply_geography_deltas(deltas):
+    """Add ``deltas`` (a mapping of ``(country_id, state_id, city_id)`` to a
+    change in customer count) to the summary table.
+
+    Costs one UPDATE per distinct location rather than per customer, plus an
+    INSERT for locations seen for the first time. Rows that drop to zero
+    are removed.
+    """
+    deltas = {key: n for key, n in deltas.items() if n}
+    if not deltas:
+        return
+    with transaction.atomic():
+        for key, n in deltas.items():
+            location = dict(zip(GEOGRAPHY_COLUMNS, key))
+            rows = GeographySummary.objects.filter(**location)
+            if rows.update(customers=F('customers') + n) or n < 0:
+                continue
+            try:
+                with transaction.atomic():
+                    GeographySummary.objects.create(customers=n, **location)
+            except IntegrityError:
+                rows.update(customers=F('customers') + n)
+        if any(n < 0 for n in deltas.values()):
+            GeographySummary.objects.filter(customers__lte=0).delete()
+
+
+def record_geography_change(before=None, after=None):
+    """Count one customer moving from location ``before`` to ``after``.
+
+    Either may be None for a customer being created or deleted. Inside
+    ``batched_geography_updates`` the change is collected and written when
+    the block exits; otherwise it is written immediately.
+    """
+    if before == after:
+        return
+    deltas = Counter()
+    if before is not None:
+        deltas[before] -= 1
+    if after is not None:
+        deltas[after] += 1
+    pending = _pending.get()
+    if pending is None:
+        apply_geography_deltas(deltas)
+    else:
+        pending.update(deltas)
+
+
+@contextmanager
+def batched_geography_updates():
+    """Collect the summary changes made by signals in this block and write
+    them as one set of deltas on exit.
+
+    Wrap bulk paths that save or delete many customers one by one, so a
+    thousand deletions in ten cities cost ten summary updates.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+    pending = Counter()
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    apply_geography_deltas(pending)
+
+
+def count_locations(customers, sign=1):
+    """Deltas adding (or with ``sign=-1`` removing) ``customers``."""
+    deltas = Counter()
+    for customer in customers:
+        deltas[geography_key(customer)] += sign
+    return deltas
+
+
+def rebuild_geography_summary():
+    """Recompute the summary table from the customer table. Returns the row count."""
+    rows = (Customer.objects.order_by().values(*GEOGRAPHY_COLUMNS)
+            .annotate(customers=Count('id')))
+    with transaction.atomic():
+        GeographySummary.objects.all().delete()
+        GeographySummary.objects.bulk_create((GeographySummary(**row) for row in rows.iterator()),
+                                             batch_size=1000)
+    return GeographySummary.objects.count()
+
+
+def geography_breakdown(country=UNSET, state=UNSET):
+    """Customer counts for the dashboard, largest first.
+
+    By country; by state within ``country``; by city within ``state``.
+    Locations are given by id, None standing for customers without one.
+    Rows are ``{'id', 'name', 'customers'}``.
+    """
+    rows = GeographySummary.objects.order_by()
+    level = 'country'
+    if country is not UNSET:
+        rows, level = rows.filter(country_id=country), 'state'
+        if state is not UNSET:
+            rows, level = rows.filter(state_id=state), 'city'
+    rows = (rows.values(f'{level}_id', f'{level}__name').annotate(total=Sum('customers'))
+            .order_by('-total', f'{level}__name'))
+    return [{'id': row[f'{level}_id'], 'name': row[f'{level}__name'] or '', 'customers': row['total']}
+            for row in rows]
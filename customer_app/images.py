@@ -0,0 +1,108 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+def webp_variant_name(name):
+    return os.path.splitext(name)[0] + '.webp'
+
+
+def optimize_image_bytes(data, max_size, quality, webp_quality):
+    """Return ``(content, extension, webp)`` for the image bytes in ``data``.
+
+    The image is rotated upright from its EXIF orientation, scaled so its
+    longest side is at most ``max_size`` and re-encoded without metadata:
+    JPEG for opaque images, PNG for ones with transparency. ``webp`` is the
+    same picture as WebP. Pure function of its arguments, so it can run in
+    a worker process without Django set up.
+    """
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        transparent = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if transparent else 'RGB')
+
+    primary = BytesIO()
+    if transparent:
+        image.save(primary, format='PNG', optimize=True)
+        extension = '.png'
+    else:
+        image.save(primary, format='JPEG', quality=quality, optimize=True, progressive=True)
+        extension = '.jpg'
+    webp = BytesIO()
+    image.save(webp, format='WEBP', quality=webp_quality, method=4)
+    return primary.getvalue(), extension, webp.getvalue()
+
+
+# What Pillow reports in ``info`` for files optimize_image_bytes wrote; any
+# other key is a metadata chunk (text, dpi, EXIF, ICC profile, comment).
+PIPELINE_INFO_KEYS = {'jfif', 'jfif_version', 'jfif_unit', 'jfif_density', 'progressive', 'progression'}
+
+
+def needs_optimizing(data, max_size):
+    """Whether ``data`` is not already what optimize_image_bytes would write.
+
+    That is a progressive RGB JPEG or an RGBA PNG, no larger than
+    ``max_size``, carrying no metadata.
+    """
+    with Image.open(BytesIO(data)) as image:
+        if image.format == 'JPEG':
+            pipeline_output = image.mode == 'RGB' and image.info.get('progressive')
+        else:
+            pipeline_output = image.format == 'PNG' and image.mode == 'RGBA'
+        return (not pipeline_output or max(image.size) > max_size
+                or not set(image.info) <= PIPELINE_INFO_KEYS or bool(image.getexif()))
+
+
+def optimize_image_file(path, max_size, quality, webp_quality):
+    """Process pool entry point for the backfill.
+
+    Returns ``(original size, content, extension, webp)``, with ``content``
+    None when the file already went through the pipeline.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not needs_optimizing(data, max_size):
+        return len(data), None, None, None
+    return (len(data),) + optimize_image_bytes(data, max_size, quality, webp_quality)
+
+
+def optimize_upload(file):
+    """Run an uploaded image through the pipeline and return the file to store.
+
+    The WebP variant, encoded from the same decoded picture, travels on the
+    file as ``webp_variant``; the storage writes it beside the stored file
+    once its content-addressed name is known.
+    """
+    file.seek(0)
+    content, extension, webp = optimize_image_bytes(
+        file.read(), settings.CUSTOMER_IMAGE_MAX_SIZE,
+        settings.CUSTOMER_IMAGE_QUALITY, settings.CUSTOMER_IMAGE_WEBP_QUALITY)
+    stem = os.path.splitext(os.path.basename(file.name or 'image'))[0]
+    optimized = ContentFile(content, name=stem + extension)
+    optimized.webp_variant = webp
+    return optimized
+
+
+def ensure_webp_variant(image):
+    """Write ``<name>.webp`` beside a stored image if it is missing.
+
+    Uploads through ``optimize_upload`` already have one; this covers
+    images stored some other way.
+    """
+    storage, name = image.storage, webp_variant_name(image.name)
+    if name == image.name or storage.exists(name):
+        return name
+    with image.open('rb') as f, Image.open(f) as source:
+        source.load()
+        picture = source.convert('RGBA' if 'A' in source.getbands() else 'RGB')
+    buffer = BytesIO()
+    picture.save(buffer, format='WEBP', quality=settings.CUSTOMER_IMAGE_WEBP_QUALITY, method=4)
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as out:
+        out.write(buffer.getvalue())
+    return name
@@ -0,0 +1,205 @@
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+import pandas as pd
+from openpyxl import load_workbook
+
+from .geography import apply_geography_deltas, count_locations, geography_key
+from .locations import intern_locations
+from .models import Customer
+from .normalize import CUSTOMER_FIELDS, normalize_frame, resolve_headers
+
+
+MODE_INSERT = 'insert'
+MODE_UPSERT = 'upsert'
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    peak_memory: Optional[int] = None
+
+    @property
+    def accepted(self):
+        return self.rows + self.updated + self.unchanged
+
+    @property
+    def processed(self):
+        return self.accepted + self.rejected
+
+    @property
+    def rows_per_second(self):
+        if not self.seconds:
+            return 0.0
+        return self.processed / self.seconds
+
+
+def iter_sheet_batches(file, batch_size):
+    """Yield the first worksheet as DataFrames of at most ``batch_size`` rows.
+
+    The workbook is opened in read-only mode so rows are parsed lazily
+    instead of loading the whole sheet into memory. Headers are resolved to
+    Customer fields once; frames are indexed by sheet row number.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = resolve_headers(header)
+        if 'first_name' not in columns.values():
+            raise ValueError('No first name column found in the sheet header.')
+        positions, fields = list(columns), list(columns.values())
+
+        batch, numbers = [], []
+        for number, values in enumerate(rows, start=2):
+            picked = [values[i] if i < len(values) else None for i in positions]
+            if all(v is None or v == '' for v in picked):
+                continue
+            batch.append(picked)
+            numbers.append(number)
+            if len(batch) >= batch_size:
+                yield pd.DataFrame(batch, columns=fields, index=numbers, dtype=object)
+                batch, numbers = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=fields, index=numbers, dtype=object)
+    finally:
+        workbook.close()
+
+
+def _write_batch(clean, result):
+    customers = [Customer(**row) for row in intern_locations(clean.to_dict('records'))]
+    with transaction.atomic():
+        Customer.objects.bulk_create(customers)
+        apply_geography_deltas(count_locations(customers))
+    result.rows += len(customers)
+    result.batches += 1
+
+
+def _match_key(email, phone):
+    if email:
+        return ('email', email)
+    if phone:
+        return ('phone', phone)
+    return None
+
+
+def _existing_customers(keys):
+    """Fetch the customers matching a batch's keys with one query per key kind.
+
+    Emails are matched case-insensitively through the ``Lower(email)``
+    index; the oldest customer wins when several share a key.
+    """
+    emails = [value for kind, value in keys if kind == 'email']
+    phones = [value for kind, value in keys if kind == 'phone']
+    existing = {}
+    if emails:
+        matches = (Customer.objects.annotate(email_key=Lower('email'))
+                   .filter(email_key__in=emails).order_by('-id'))
+        existing.update({('email', c.email_key): c for c in matches})
+    if phones:
+        matches = Customer.objects.filter(phone__in=phones).order_by('-id')
+        existing.update({('phone', c.phone): c for c in matches})
+    return existing
+
+
+def _upsert_batch(clean, result):
+    """Update customers matching a row's key and insert the rest.
+
+    Rows whose values already match are skipped, so re-importing an
+    unchanged sheet writes nothing.
+    """
+    rows = {}
+    unkeyed = []
+    for row in intern_locations(clean.to_dict('records')):
+        key = _match_key(row['email'], row['phone'])
+        if key is None:
+            unkeyed.append(row)
+        else:
+            rows[key] = row  # the last occurrence in the batch wins
+
+    existing = _existing_customers(rows)
+    now = timezone.now()
+    to_create = [Customer(**row) for row in unkeyed]
+    to_update = []
+    moved = Counter()
+    for key, row in rows.items():
+        customer = existing.get(key)
+        if customer is None:
+            to_create.append(Customer(**row))
+        elif any(getattr(customer, name) != value for name, value in row.items()):
+            moved[geography_key(customer)] -= 1
+            for name, value in row.items():
+                setattr(customer, name, value)
+            moved[geography_key(customer)] += 1
+            customer.updated_at = now
+            to_update.append(customer)
+        else:
+            result.unchanged += 1
+
+    with transaction.atomic():
+        Customer.objects.bulk_create(to_create)
+        Customer.objects.bulk_update(to_update, CUSTOMER_FIELDS + ['updated_at'])
+        moved.update(count_locations(to_create))
+        apply_geography_deltas(moved)
+    result.rows += len(to_create)
+    result.updated += len(to_update)
+    # Rows superseded by a later duplicate in the same batch.
+    result.unchanged += len(clean) - len(rows) - len(unkeyed)
+    result.batches += 1
+
+
+def _write_rejects(rejects, result, reject_report):
+    if reject_report is not None and len(rejects):
+        rejects.to_csv(reject_report, header=not result.rejected, index_label='row')
+    result.rejected += len(rejects)
+
+
+def import_customers(file, batch_size=None, measure_memory=False, on_batch=None, reject_report=None,
+                     mode=MODE_INSERT):
+    """Stream customers from an Excel file into the database.
+
+    Each batch of ``batch_size`` rows (``CUSTOMER_IMPORT_BATCH_SIZE`` by
+    default) is normalized and validated column-wise; valid rows are
+    written in their own transaction and invalid ones are appended as CSV
+    to the ``reject_report`` text stream, if given. ``MODE_INSERT`` inserts
+    every row; ``MODE_UPSERT`` updates customers matched by email (or phone
+    when a row has no email) and inserts the rest.
+    ``on_batch`` is called with the running result after every batch. With
+    ``measure_memory`` the peak Python heap usage of the import is recorded
+    through ``tracemalloc``.
+    """
+    batch_size = batch_size or settings.CUSTOMER_IMPORT_BATCH_SIZE
+    write_batch = _upsert_batch if mode == MODE_UPSERT else _write_batch
+    result = ImportResult()
+    if measure_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        for frame in iter_sheet_batches(file, batch_size):
+            clean, rejects = normalize_frame(frame)
+            _write_rejects(rejects, result, reject_report)
+            if len(clean):
+                write_batch(clean, result)
+            result.seconds = time.perf_counter() - started
+            if on_batch:
+                on_batch(result)
+    finally:
+        result.seconds = time.perf_counter() - started
+        if measure_memory:
+            result.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result
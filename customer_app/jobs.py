@@ -0,0 +1,163 @@
+import asyncio
+import contextvars
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.signals import request_started
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .importer import import_customers
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_blocking_executor = None
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CUSTOMER_IMPORT_WORKERS,
+                thread_name_prefix='customer-import',
+            )
+    return _executor
+
+
+def _run_closing_connections(func, *args):
+    try:
+        return func(*args)
+    finally:
+        connection.close()
+
+
+async def run_blocking(func, *args):
+    """Await ``func(*args)`` run on the ``CUSTOMER_BLOCKING_WORKERS`` pool.
+
+    For CPU-heavy work (PDF rendering, spreadsheet parsing) called from
+    async views: unlike ``sync_to_async`` it does not queue behind every
+    other request's ORM calls on the one thread-sensitive thread. The
+    worker's database connection is closed afterwards.
+    """
+    global _blocking_executor
+    with _executor_lock:
+        if _blocking_executor is None:
+            _blocking_executor = ThreadPoolExecutor(
+                max_workers=settings.CUSTOMER_BLOCKING_WORKERS,
+                thread_name_prefix='customer-blocking',
+            )
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _blocking_executor, context.run, _run_closing_connections, func, *args)
+
+
+def discard_upload(job):
+    """Delete the workbook stored for ``job``; it is not needed once it has run."""
+    if job.file:
+        job.file.delete(save=False)
+    ImportJob.objects.filter(pk=job.pk).update(file='')
+
+
+def run_import_job(job_pk):
+    job = ImportJob.objects.get(pk=job_pk)
+    ImportJob.objects.filter(pk=job.pk).update(
+        status=ImportJob.STATUS_RUNNING, started_at=timezone.now(), updated_at=timezone.now())
+    try:
+        _import(job)
+    finally:
+        discard_upload(job)
+
+
+def _import(job):
+    def report_progress(result):
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=result.accepted,
+            rows_updated=result.updated,
+            rows_rejected=result.rejected,
+            rows_per_second=result.rows_per_second,
+            updated_at=timezone.now(),
+        )
+
+    with tempfile.TemporaryFile(mode='w+', newline='') as rejects:
+        try:
+            with job.file.open('rb') as excel:
+                result = import_customers(excel, on_batch=report_progress, reject_report=rejects,
+                                          mode=job.mode)
+        except Exception as e:
+            logger.exception('Import job %s failed', job.pk)
+            ImportJob.objects.filter(pk=job.pk).update(
+                status=ImportJob.STATUS_FAILED, error=str(e),
+                finished_at=timezone.now(), updated_at=timezone.now())
+            return
+        if result.rejected:
+            rejects.seek(0)
+            job.reject_report.save(f'import_{job.pk}_rejects.csv', File(rejects), save=False)
+
+    ImportJob.objects.filter(pk=job.pk).update(
+        status=ImportJob.STATUS_DONE,
+        rows_processed=result.accepted,
+        rows_updated=result.updated,
+        rows_rejected=result.rejected,
+        rows_per_second=result.rows_per_second,
+        reject_report=job.reject_report.name or '',
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def _run_in_worker(job_pk):
+    close_old_connections()
+    try:
+        run_import_job(job_pk)
+    finally:
+        connection.close()
+
+
+def fail_abandoned_jobs():
+    """Mark pending or running jobs that have gone quiet as failed.
+
+    Jobs only live in the pool of the process that queued them, so a restart
+    drops them while their rows still say pending or running. A job counts
+    as abandoned once it has not reported progress for
+    ``CUSTOMER_IMPORT_STALE_SECONDS``. Returns the number of jobs failed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.CUSTOMER_IMPORT_STALE_SECONDS)
+    jobs = ImportJob.objects.filter(
+        status__in=[ImportJob.STATUS_PENDING, ImportJob.STATUS_RUNNING], updated_at__lt=cutoff)
+    failed = 0
+    for job in jobs:
+        # Re-check the filter in the UPDATE in case the job moved on meanwhile.
+        if jobs.filter(pk=job.pk).update(status=ImportJob.STATUS_FAILED, error='Interrupted by a server restart.',
+                                         finished_at=timezone.now(), updated_at=timezone.now()):
+            discard_upload(job)
+            failed += 1
+    return failed
+
+
+def fail_abandoned_jobs_on_first_request(sender, **kwargs):
+    request_started.disconnect(fail_abandoned_jobs_on_first_request)
+    try:
+        fail_abandoned_jobs()
+    except Exception:
+        logger.exception('Could not fail abandoned import jobs')
+
+
+def enqueue_import(job):
+    """Run ``job`` on the worker pool once the current transaction commits.
+
+    With ``CUSTOMER_IMPORT_ASYNC`` disabled the import runs immediately in
+    the calling thread instead.
+    """
+    if not settings.CUSTOMER_IMPORT_ASYNC:
+        run_import_job(job.pk)
+        return
+    transaction.on_commit(lambda: get_executor().submit(_run_in_worker, job.pk))
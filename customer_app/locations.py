@@ -0,0 +1,146 @@
+"""Interned city, state and country names.
+
+Customers reference ``City``, ``State`` and ``Country`` rows instead of
+repeating the names. Names are mapped to ids through a process-wide cache,
+so after warm-up an import batch resolves its locations without queries.
+"""
+import threading
+
+from django import forms
+from django.db import models, transaction
+from django.db.models import Value
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+from django.db.models.functions import Coalesce
+
+LOCATION_FIELDS = ['city', 'state', 'country']
+
+_ids = {}
+_lock = threading.Lock()
+
+
+def _remember(model, found):
+    with _lock:
+        _ids.setdefault(model, {}).update(found)
+
+
+def location_ids(model, names):
+    """Return ``{name: id}`` for ``names``, creating rows for new names.
+
+    Blank names are left out; they are stored as NULL. Ids enter the cache
+    only once the transaction that read or created them commits, so a
+    rollback cannot leave the cache pointing at missing rows.
+    """
+    names = {name for name in names if name}
+    with _lock:
+        cached = _ids.get(model, {})
+        ids = {name: cached[name] for name in names if name in cached}
+    missing = names - ids.keys()
+    if missing:
+        found = dict(model.objects.filter(name__in=missing).values_list('name', 'id'))
+        new = missing - found.keys()
+        if new:
+            model.objects.bulk_create([model(name=name) for name in new], ignore_conflicts=True)
+            found.update(model.objects.filter(name__in=new).values_list('name', 'id'))
+        ids.update(found)
+        transaction.on_commit(lambda: _remember(model, found))
+    return ids
+
+
+def resolve_location(model, name):
+    """Return the ``model`` instance for ``name``, or None when blank."""
+    pk = location_ids(model, [name]).get(name)
+    return model(pk=pk, name=name) if pk else None
+
+
+def intern_locations(rows):
+    """Replace location names in ``rows`` (dicts of Customer fields) with ids.
+
+    One lookup per location kind for the whole batch, rather than per row.
+    """
+    from .models import Customer
+
+    for name in LOCATION_FIELDS:
+        if not rows or name not in rows[0]:
+            continue
+        model = Customer._meta.get_field(name).related_model
+        ids = location_ids(model, (row[name] for row in rows))
+        for row in rows:
+            row[f'{name}_id'] = ids.get(row.pop(name))
+    return rows
+
+
+def location_columns(fields):
+    """``fields`` for ``values_list``, with location fields read as their names ('' when unset)."""
+    return [Coalesce(f'{name}__name', Value('')) if name in LOCATION_FIELDS else name for name in fields]
+
+
+class LocationDescriptor(ForwardManyToOneDescriptor):
+    """Accepts a name, which is only looked up when the instance is saved.
+
+    Until then reading the attribute gives an unsaved location carrying the
+    name, so forms that fail validation never create location rows.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is not None:
+            name = instance.__dict__.get(self.field.pending_attname)
+            if name is not None:
+                return self.field.related_model(name=name)
+        return super().__get__(instance, cls)
+
+    def __set__(self, instance, value):
+        instance.__dict__.pop(self.field.pending_attname, None)
+        if isinstance(value, str):
+            # Leave nothing cached: Model.save() refuses unsaved related objects.
+            setattr(instance, self.field.attname, None)
+            if self.field.is_cached(instance):
+                self.field.delete_cached_value(instance)
+            if value:
+                instance.__dict__[self.field.pending_attname] = value
+            return
+        super().__set__(instance, value)
+
+
+class LocationField(models.ForeignKey):
+    """Optional foreign key to an interned location that also accepts a name.
+
+    ``customer.city = 'Kochi'`` is resolved to a ``City`` (created if needed)
+    when the customer is saved, and forms edit the name as plain text.
+    """
+
+    forward_related_accessor_class = LocationDescriptor
+
+    def __init__(self, to, **kwargs):
+        kwargs.setdefault('on_delete', models.PROTECT)
+        kwargs.setdefault('null', True)
+        kwargs.setdefault('blank', True)
+        super().__init__(to, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        for key, default in (('null', True), ('blank', True)):
+            if kwargs.get(key) == default:
+                del kwargs[key]
+            else:
+                kwargs[key] = False
+        return name, path, args, kwargs
+
+    @property
+    def pending_attname(self):
+        return f'_{self.name}_pending_name'
+
+    def pre_save(self, model_instance, add):
+        name = model_instance.__dict__.pop(self.pending_attname, None)
+        if name is not None:
+            setattr(model_instance, self.name, resolve_location(self.related_model, name))
+        return super().pre_save(model_instance, add)
+
+    def formfield(self, **kwargs):
+        for key in ('queryset', 'to_field_name', 'limit_choices_to', 'blank'):
+            kwargs.pop(key, None)
+        max_length = self.related_model._meta.get_field('name').max_length
+        return models.Field.formfield(self, form_class=forms.CharField, max_length=max_length, **kwargs)
+
+    def value_from_object(self, obj):
+        location = getattr(obj, self.name)
+        return location.name if location else ''
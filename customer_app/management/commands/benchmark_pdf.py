@@ -0,0 +1,45 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_app.models import Customer
+from customer_app.pdf import (
+    build_customers_report, build_customers_report_parallel, customer_records, parallel_available, report_queryset,
+)
+
+
+class Command(BaseCommand):
+    help = 'Time the serial and process-pool customers PDF report against the current database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--chunk-size', type=int, default=settings.CUSTOMER_PDF_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if not parallel_available():
+            raise CommandError('Parallel PDF rendering requires the pypdf package.')
+
+        customers = report_queryset(Customer.objects.all())
+        count = customers.count()
+
+        with tempfile.TemporaryFile() as out:
+            started = time.perf_counter()
+            build_customers_report(customers.iterator(chunk_size=500), out)
+            serial = time.perf_counter() - started
+            serial_size = out.tell()
+
+        with tempfile.TemporaryFile() as out:
+            started = time.perf_counter()
+            build_customers_report_parallel(customer_records(customers), out,
+                                            workers=options['workers'], chunk_size=options['chunk_size'])
+            parallel = time.perf_counter() - started
+            parallel_size = out.tell()
+
+        self.stdout.write(f'customers: {count}')
+        self.stdout.write(f'serial:    {serial:.2f}s ({serial_size / 1024:.0f} KB)')
+        self.stdout.write(f'parallel:  {parallel:.2f}s ({parallel_size / 1024:.0f} KB, '
+                          f'{options["workers"]} workers, chunks of {options["chunk_size"]})')
+        self.stdout.write(self.style.SUCCESS(f'speedup:   {serial / parallel:.2f}x'))
@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from customer_app.locations import LOCATION_FIELDS
+from customer_app.models import Customer
+from customer_app.normalize import CUSTOMER_FIELDS
+from customer_app.synthetic import synthetic_rows
+
+NO_FRAGMENT_CACHE = {
+    **settings.CACHES,
+    'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Time rendering customer_list.html with and without the per-row fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='*', default=[100, 1000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/customers/')
+        request.user = User(pk=1, username='benchmark')
+        get_token(request)
+        now = timezone.now()
+
+        for count in options['rows']:
+            # The list does not show locations; leaving them unset keeps
+            # the benchmark from looking names up in the database.
+            customers = [
+                Customer(pk=n + 1, updated_at=now, **{name: value for name, value in zip(CUSTOMER_FIELDS, row)
+                                                      if name not in LOCATION_FIELDS})
+                for n, row in enumerate(synthetic_rows(count))
+            ]
+            context = {'customers': customers, 'import_jobs': [],
+                       'row_cache_timeout': settings.CUSTOMER_ROW_CACHE_SECONDS}
+
+            def render():
+                started = time.perf_counter()
+                render_to_string('customer_list.html', context, request)
+                return time.perf_counter() - started
+
+            with override_settings(CACHES=NO_FRAGMENT_CACHE):
+                render()
+                uncached = statistics.median(render() for _ in range(options['repeat']))
+            caches['template_fragments'].clear()
+            cold = render()
+            warm = statistics.median(render() for _ in range(options['repeat']))
+
+            self.stdout.write(f'{count} rows: no row cache {uncached * 1000:.1f}ms, '
+                              f'cold {cold * 1000:.1f}ms, warm {warm * 1000:.1f}ms')
+            self.stdout.write(self.style.SUCCESS(f'{count} rows: {uncached / warm:.1f}x faster when warm'))
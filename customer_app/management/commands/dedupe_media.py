@@ -0,0 +1,83 @@
+import os
+import re
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from customer_app.images import webp_variant_name
+from customer_app.models import Customer, MediaBlob
+from customer_app.storage import content_addressed_name
+from customer_app.thumbnails import content_hash
+
+CONTENT_ADDRESSED = re.compile(r'/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+class Command(BaseCommand):
+    help = ('Move customer images to content-addressed names, rebuild reference counts '
+            'and delete image files no customer refers to.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without touching anything.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        field = Customer._meta.get_field('image')
+        storage = field.storage
+        with_image = Customer.objects.exclude(image='').exclude(image=None)
+
+        renames = {}
+        for name in with_image.values_list('image', flat=True).distinct().iterator():
+            if CONTENT_ADDRESSED.search(name):
+                continue
+            if not storage.exists(name):
+                self.stderr.write(f'Missing file: {name}')
+                continue
+            with storage.open(name) as f:
+                digest = content_hash(f)
+            new_name = content_addressed_name(os.path.dirname(name), digest, os.path.splitext(name)[1])
+            renames[name] = (new_name, digest)
+            if not dry_run and not storage.exists(new_name):
+                os.makedirs(os.path.dirname(storage.path(new_name)), exist_ok=True)
+                shutil.copyfile(storage.path(name), storage.path(new_name))
+
+        if dry_run:
+            referenced = {renames.get(name, (name,))[0] for name in with_image.values_list('image', flat=True)}
+        else:
+            with transaction.atomic():
+                for name, (new_name, digest) in renames.items():
+                    with_image.filter(image=name).update(image=new_name, image_hash=digest)
+                counts = dict(with_image.values_list('image').annotate(n=Count('id')).order_by())
+                MediaBlob.objects.exclude(name__in=counts).delete()
+                blobs = {blob.name: blob for blob in MediaBlob.objects.all()}
+                for name, refcount in counts.items():
+                    blob = blobs.get(name)
+                    if blob is None:
+                        size = storage.size(name) if storage.exists(name) else 0
+                        MediaBlob.objects.create(name=name, size=size, refcount=refcount)
+                    elif blob.refcount != refcount:
+                        blob.refcount = refcount
+                        blob.save(update_fields=['refcount'])
+            referenced = set(counts)
+
+        referenced |= {webp_variant_name(name) for name in referenced}
+        orphans = reclaimed = 0
+        root = storage.path(field.upload_to)
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                if name in referenced:
+                    continue
+                orphans += 1
+                reclaimed += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+
+        prefix = 'Would move' if dry_run else 'Moved'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {len(renames)} images to content-addressed names; '
+            f'{orphans} orphaned files ({reclaimed / 1024:.0f} KB) '
+            f'{"would be " if dry_run else ""}reclaimed.'
+        ))
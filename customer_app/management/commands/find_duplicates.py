@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from customer_app.duplicates import find_duplicate_clusters, merge_clusters
+from customer_app.models import Customer
+
+
+class Command(BaseCommand):
+    help = 'List clusters of likely-duplicate customers and optionally merge them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--merge', action='store_true',
+                            help='Merge every cluster into its oldest customer.')
+        parser.add_argument('--limit', type=int, default=50, help='Number of clusters to print.')
+
+    def handle(self, *args, **options):
+        clusters = find_duplicate_clusters()
+        for cluster in clusters[:options['limit']]:
+            customers = Customer.objects.filter(pk__in=cluster).order_by('pk')
+            self.stdout.write(', '.join(
+                f'#{c.pk} {c.first_name} {c.last_name} <{c.email}> {c.phone}'.replace(' <>', '')
+                for c in customers
+            ))
+
+        if options['merge'] and clusters:
+            removed = merge_clusters(clusters)
+            self.stdout.write(self.style.SUCCESS(
+                f'Merged {len(clusters)} clusters, removing {removed} duplicate customers.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Found {len(clusters)} clusters covering {sum(map(len, clusters))} customers.'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from customer_app.models import Customer
+from customer_app.thumbnails import content_hash, ensure_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Hash customer images that have no content hash yet and generate any missing thumbnails.'
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        for customer in Customer.objects.exclude(image='').exclude(image=None).iterator(chunk_size=500):
+            try:
+                if not customer.image_hash:
+                    with customer.image.open('rb'):
+                        customer.image_hash = content_hash(customer.image)
+                    Customer.objects.filter(pk=customer.pk).update(image_hash=customer.image_hash)
+                ensure_thumbnails(customer.image, customer.image_hash)
+                generated += 1
+            except (OSError, ValueError) as e:
+                failed += 1
+                self.stderr.write(f'Customer {customer.pk}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Thumbnails ready for {generated} customers ({failed} failed).'))
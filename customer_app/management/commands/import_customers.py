@@ -0,0 +1,31 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_app.importer import MODE_INSERT, MODE_UPSERT, import_customers
+
+
+class Command(BaseCommand):
+    help = 'Import customers from an Excel file and report throughput and peak memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--mode', choices=[MODE_INSERT, MODE_UPSERT], default=MODE_INSERT)
+        parser.add_argument('--rejects', help='Write rejected rows and reasons to this CSV file.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as excel, \
+                    open(options['rejects'] or os.devnull, 'w', newline='') as rejects:
+                result = import_customers(excel, batch_size=options['batch_size'], measure_memory=True,
+                                          reject_report=rejects, mode=options['mode'])
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.rows} new and {result.updated} updated customers '
+            f'({result.unchanged} unchanged, {result.rejected} rejected) in {result.batches} batches '
+            f'in {result.seconds:.2f}s ({result.rows_per_second:.0f} rows/sec, '
+            f'peak memory {result.peak_memory / 1024 / 1024:.1f} MB)'
+        ))
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from customer_app.db import throwaway_databases
+from customer_app.models import Customer
+from customer_app.synthetic import seed_customers
+
+
+class Command(BaseCommand):
+    help = ('Compare throughput of the sync (WSGI) and async (ASGI) customer views under concurrent '
+            'load, against a throwaway database seeded with synthetic customers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=500, help='Requests per mode.')
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp(prefix='loadtest-media-')
+        try:
+            with throwaway_databases(), override_settings(
+                    MEDIA_ROOT=media_root, METRICS_SLOW_REQUEST_SECONDS=None,
+                    CUSTOMER_PDF_CACHE_DIR=os.path.join(media_root, 'pdf-cache')):
+                self.compare(options)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def compare(self, options):
+        seed_customers(options['customers'])
+        self.user = User.objects.create_user('loadtest')
+        customer = Customer.objects.order_by('pk')[options['customers'] // 2]
+        urls = [
+            reverse('customer_list'),
+            reverse('customer_list') + '?q=Menon',
+            reverse('customer_detail', args=[customer.pk]),
+            reverse('customer_search') + '?q=Nair',
+            reverse('customer_changes') + '?limit=100',
+        ]
+        urls = [urls[n % len(urls)] for n in range(options['requests'])]
+
+        with override_settings(ROOT_URLCONF='Customer.urls'):
+            wsgi = self.run_wsgi(urls, options['concurrency'])
+        self.report('WSGI (sync views, thread per request)', wsgi)
+        with override_settings(ROOT_URLCONF='Customer.asgi_urls'):
+            client = AsyncClient()
+            client.force_login(self.user)
+            asgi = asyncio.run(self.run_asgi(client, urls, options['concurrency']))
+        self.report('ASGI (async views, one event loop)', asgi)
+        self.stdout.write(self.style.SUCCESS(f'ASGI/WSGI throughput: {asgi[0] / wsgi[0]:.2f}x'))
+
+    def run_wsgi(self, urls, concurrency):
+        def worker(client, batch):
+            timings = []
+            for url in batch:
+                started = time.perf_counter()
+                self.expect_ok(url, client.get(url))
+                timings.append(time.perf_counter() - started)
+            connection.close()
+            return timings
+
+        # Log in up front: SQLite allows one writer at a time.
+        clients = [Client() for _ in range(concurrency)]
+        for client in clients:
+            client.force_login(self.user)
+        batches = [urls[n::concurrency] for n in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = [t for batch in pool.map(worker, clients, batches) for t in batch]
+        return len(urls) / (time.perf_counter() - started), timings
+
+    async def run_asgi(self, client, urls, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url):
+            async with semaphore:
+                started = time.perf_counter()
+                self.expect_ok(url, await client.get(url))
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(fetch(url) for url in urls))
+        return len(urls) / (time.perf_counter() - started), timings
+
+    @staticmethod
+    def expect_ok(url, response):
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+
+    def report(self, name, result):
+        per_second, timings = result
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(f'{name:<40} {per_second:8.1f} req/s  p50 {statistics.median(timings) * 1000:7.1f}ms  '
+                          f'p95 {p95 * 1000:7.1f}ms')
@@ -0,0 +1,82 @@
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from customer_app.images import ensure_webp_variant, optimize_image_file, webp_variant_name
+from customer_app.models import Customer
+from customer_app.storage import content_addressed_name
+from customer_app.thumbnails import delete_thumbnails, ensure_thumbnails
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as out:
+        out.write(data)
+
+
+class Command(BaseCommand):
+    help = ('Run stored customer images through the upload pipeline (resize, strip metadata, '
+            'recompress, WebP copy) in a process pool and point customers at the results.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+
+    def handle(self, *args, **options):
+        storage = Customer._meta.get_field('image').storage
+        with_image = Customer.objects.exclude(image='').exclude(image=None)
+        names = [
+            name for name in with_image.values_list('image', flat=True).distinct().iterator()
+            if storage.exists(name)
+        ]
+        args = (settings.CUSTOMER_IMAGE_MAX_SIZE, settings.CUSTOMER_IMAGE_QUALITY,
+                settings.CUSTOMER_IMAGE_WEBP_QUALITY)
+
+        processed = failed = saved = 0
+        # Workers only decode and encode bytes; files, rows and reference
+        # counts are updated here, one image at a time.
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as pool:
+            window = max(1, options['workers']) * 4
+            for start in range(0, len(names), window):
+                batch = names[start:start + window]
+                futures = [pool.submit(optimize_image_file, storage.path(name), *args) for name in batch]
+                for name, future in zip(batch, futures):
+                    try:
+                        before, content, extension, webp = future.result()
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f'{name}: {e}')
+                        continue
+                    if content is None:
+                        ensure_webp_variant(Customer(image=name).image)
+                        continue
+                    digest = hashlib.sha256(content).hexdigest()
+                    new_name = content_addressed_name(os.path.dirname(name), digest, extension)
+                    if not storage.exists(new_name):
+                        _write(storage.path(new_name), content)
+                    _write(storage.path(webp_variant_name(new_name)), webp)
+                    if new_name != name:
+                        self.replace(storage, with_image, name, new_name, digest, len(content))
+                    processed += 1
+                    saved += before - len(content)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Optimized {processed} of {len(names)} images ({failed} failed), saving {saved / 1024 / 1024:.1f} MB.'))
+
+    def replace(self, storage, with_image, name, new_name, digest, size):
+        customers = with_image.filter(image=name)
+        old_hashes = set(customers.values_list('image_hash', flat=True))
+        with transaction.atomic():
+            count = customers.update(image=new_name, image_hash=digest, updated_at=timezone.now())
+            storage.acquire(new_name, size, count=count)
+            storage.release(name, count=count)
+        ensure_thumbnails(Customer(image=new_name).image, digest)
+        for image_hash in old_hashes - {digest}:
+            if image_hash and not Customer.objects.filter(image_hash=image_hash).exists():
+                delete_thumbnails(image_hash)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from customer_app.geography import rebuild_geography_summary
+
+
+class Command(BaseCommand):
+    help = 'Recompute the customer geography summary table from the customer table.'
+
+    def handle(self, *args, **options):
+        rows = rebuild_geography_summary()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt geography summary: {rows} locations.'))
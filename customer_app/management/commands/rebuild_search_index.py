@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_app.search import fts_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text customer search index from the customer table.'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('The full-text search index is only available on SQLite.')
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS('Customer search index rebuilt.'))
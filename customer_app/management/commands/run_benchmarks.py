@@ -0,0 +1,142 @@
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from customer_app.db import throwaway_databases
+from customer_app.models import Customer
+from customer_app.synthetic import seed_customers, write_sheet
+
+
+class Command(BaseCommand):
+    help = ('Time the key customer endpoints against a throwaway database seeded with synthetic '
+            'customers, write the results as JSON and optionally compare them with a baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=10000)
+        parser.add_argument('--images', type=int, default=20)
+        parser.add_argument('--sheet-sizes', type=int, nargs='*', default=[1000, 10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per read endpoint. Uploads and the full PDF run once.')
+        parser.add_argument('--output', default='benchmark_results.json')
+        parser.add_argument('--baseline', help='Previous results file to compare against.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Fail when a median is this fraction slower than the baseline.')
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp(prefix='bench-media-')
+        try:
+            with throwaway_databases(), override_settings(
+                    MEDIA_ROOT=media_root, CUSTOMER_IMPORT_ASYNC=False,
+                    CUSTOMER_PDF_CACHE_DIR=os.path.join(media_root, 'pdf-cache'),
+                    METRICS_SLOW_REQUEST_SECONDS=None):
+                results = self.run_suite(options, media_root)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'customers': options['customers'],
+                'repeat': options['repeat'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'machine': platform.machine(),
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f'Wrote {options["output"]}')
+
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['threshold'])
+
+    def run_suite(self, options, media_root):
+        started = time.perf_counter()
+        seed_customers(options['customers'], images=options['images'])
+        self.stdout.write(f'Seeded {options["customers"]} customers in {time.perf_counter() - started:.1f}s')
+
+        client = Client()
+        client.force_login(User.objects.create_user('benchmark'))
+        customer = Customer.objects.order_by('pk')[options['customers'] // 2]
+        results = {}
+
+        endpoints = [
+            ('customer_list', reverse('customer_list'), options['repeat']),
+            ('customer_list_search', reverse('customer_list') + '?q=Menon', options['repeat']),
+            ('customer_detail', reverse('customer_detail', args=[customer.pk]), options['repeat']),
+            ('download_customer_pdf_individual',
+             reverse('download_customer_pdf_individual', args=[customer.pk]), options['repeat']),
+            ('download_customers_pdf', reverse('download_customers_pdf'), 1),
+        ]
+        for name, url, repeat in endpoints:
+            results[name] = self.time(client, url, repeat)
+            self.report(name, results[name])
+
+        for size in options['sheet_sizes']:
+            path = os.path.join(media_root, f'sheet_{size}.xlsx')
+            write_sheet(path, size, offset=Customer.objects.count())
+            with open(path, 'rb') as sheet:
+                started = time.perf_counter()
+                response = client.post(reverse('customer_bulk_upload'), {'excel_file': sheet})
+                seconds = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(f'Upload of {size} rows failed with {response.status_code}')
+            results[f'customer_bulk_upload_{size}'] = {
+                'median': seconds, 'min': seconds, 'max': seconds, 'runs': 1,
+                'rows_per_second': size / seconds,
+            }
+            self.report(f'customer_bulk_upload_{size}', results[f'customer_bulk_upload_{size}'])
+        return results
+
+    def time(self, client, url, repeat):
+        # One untimed request first so one-off work (thumbnails, the
+        # profile PDF cache) is not counted; single runs skip it.
+        if repeat > 1:
+            self.fetch(client, url)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            self.fetch(client, url)
+            timings.append(time.perf_counter() - started)
+        return {'median': statistics.median(timings), 'min': min(timings), 'max': max(timings), 'runs': repeat}
+
+    @staticmethod
+    def fetch(client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def report(self, name, result):
+        self.stdout.write(f'{name:<50} median {result["median"] * 1000:9.1f}ms  '
+                          f'min {result["min"] * 1000:9.1f}ms  max {result["max"] * 1000:9.1f}ms')
+
+    def compare(self, results, baseline_path, threshold):
+        with open(baseline_path) as f:
+            baseline = json.load(f)['results']
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            ratio = result['median'] / baseline[name]['median']
+            self.stdout.write(f'{name:<50} {ratio:6.2f}x baseline')
+            if ratio > 1 + threshold:
+                regressions.append(f'{name} ({ratio:.2f}x)')
+        if regressions:
+            raise CommandError(f'Regressions beyond {threshold:.0%}: {", ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from customer_app.synthetic import seed_customers
+
+
+class Command(BaseCommand):
+    help = 'Insert N synthetic customers with bulk inserts, optionally sharing a few generated images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--images', type=int, default=0,
+                            help='Number of distinct images to generate and spread across the customers.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = seed_customers(options['count'], batch_size=options['batch_size'],
+                                 images=options['images'], seed=options['seed'])
+        seconds = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} customers in {seconds:.2f}s ({created / max(seconds, 1e-9):.0f} rows/sec)'))
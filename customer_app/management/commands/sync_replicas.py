@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from customer_app.db import copy_sqlite_database
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into every replica in DATABASE_REPLICAS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep syncing every this many seconds instead of once.')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No replicas configured; set DJANGO_DB_REPLICAS.')
+        source = connections['default'].settings_dict['NAME']
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                started = time.perf_counter()
+                copy_sqlite_database(source, connections[alias].settings_dict['NAME'])
+                self.stdout.write(f'{alias}: synced in {time.perf_counter() - started:.2f}s')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,104 @@
+import bisect
+import threading
+from collections import defaultdict
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Process-local counters and histograms, rendered in Prometheus text format.
+
+    Each metric is keyed by a tuple of label values; the label names are
+    fixed per metric when it is declared.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _declare(self, name, kind, help_text, labels, buckets=None):
+        if name not in self._metrics:
+            factory = (lambda: Histogram(buckets)) if kind == 'histogram' else float
+            self._metrics[name] = {'kind': kind, 'help': help_text, 'labels': labels,
+                                   'values': defaultdict(factory)}
+        return self._metrics[name]
+
+    def counter(self, name, help_text, labels):
+        with self._lock:
+            self._declare(name, 'counter', help_text, labels)
+
+    def histogram(self, name, help_text, labels, buckets):
+        with self._lock:
+            self._declare(name, 'histogram', help_text, labels, buckets)
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._metrics[name]['values'][labels] += amount
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            self._metrics[name]['values'][labels].observe(value)
+
+    def value(self, name, labels):
+        with self._lock:
+            return self._metrics[name]['values'].get(labels)
+
+    def clear(self):
+        with self._lock:
+            for metric in self._metrics.values():
+                metric['values'].clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, metric in sorted(self._metrics.items()):
+                lines.append(f'# HELP {name} {metric["help"]}')
+                lines.append(f'# TYPE {name} {metric["kind"]}')
+                for labels, value in sorted(metric['values'].items()):
+                    pairs = [f'{k}="{_escape(v)}"' for k, v in zip(metric['labels'], labels)]
+                    if metric['kind'] == 'counter':
+                        lines.append(f'{name}{_labels(pairs)} {_number(value)}')
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(value.buckets + ('+Inf',), value.counts):
+                        cumulative += count
+                        le = 'le="{}"'.format(bound if bound == '+Inf' else _number(bound))
+                        lines.append(f'{name}_bucket{_labels(pairs + [le])} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(pairs)} {_number(value.sum)}')
+                    lines.append(f'{name}_count{_labels(pairs)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+registry = Registry()
+registry.counter('http_requests_total', 'Requests by view, method and status code.',
+                 ('view', 'method', 'status'))
+registry.histogram('http_request_duration_seconds', 'Time spent producing the response.',
+                   ('view',), LATENCY_BUCKETS)
+registry.histogram('http_response_size_bytes', 'Response body size.', ('view',), SIZE_BUCKETS)
+registry.histogram('db_queries_per_request', 'SQL queries run per request.', ('view',), QUERY_COUNT_BUCKETS)
+registry.counter('db_query_duration_seconds_total', 'Time spent in SQL queries.', ('view',))
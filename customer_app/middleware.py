@@ -0,0 +1,185 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import registry
+from .routers import read_alias
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_pin'
+
+
+_recorder = ContextVar('customer_query_recorder', default=None)
+
+
+class QueryRecorder:
+    """Totals query count and time for one request, grouped by SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.by_sql = {}
+
+    def add(self, sql, elapsed):
+        self.count += 1
+        self.seconds += elapsed
+        calls, total = self.by_sql.get(sql, (0, 0.0))
+        self.by_sql[sql] = (calls + 1, total + elapsed)
+
+    def top(self, limit):
+        return sorted(self.by_sql.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """``connection_created`` receiver adding the query timing wrapper.
+
+    The wrapper reports to the recorder in the current context, which
+    follows a request into ``sync_to_async`` threads, so async views are
+    measured too.
+    """
+    connection.execute_wrappers.append(_record_query)
+
+
+class RequestMetricsMiddleware:
+    """Record latency, SQL queries and response size per URL name.
+
+    Requests slower than ``METRICS_SLOW_REQUEST_SECONDS`` are logged with
+    their most expensive queries. Streamed bodies are measured as they are
+    sent. Works for both sync and async requests.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.record(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.record(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, recorder, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or '<unresolved>'
+        registry.inc('http_requests_total', (view, request.method, str(response.status_code)))
+        registry.observe('http_request_duration_seconds', (view,), elapsed)
+        registry.observe('db_queries_per_request', (view,), recorder.count)
+        registry.inc('db_query_duration_seconds_total', (view,), recorder.seconds)
+
+        if response.streaming:
+            measure = self._ameasure_stream if response.is_async else self._measure_stream
+            response.streaming_content = measure(response.streaming_content, view)
+        else:
+            registry.observe('http_response_size_bytes', (view,), len(response.content))
+
+        threshold = settings.METRICS_SLOW_REQUEST_SECONDS
+        if threshold is not None and elapsed >= threshold:
+            top = '\n'.join(
+                f'  {calls}x {total * 1000:.1f}ms {sql[:300]}'
+                for sql, (calls, total) in recorder.top(settings.METRICS_SLOW_REQUEST_TOP_QUERIES)
+            )
+            logger.warning('Slow request %s %s (%s): %.3fs, %d queries in %.3fs\n%s',
+                           request.method, request.path, view, elapsed,
+                           recorder.count, recorder.seconds, top)
+
+    @staticmethod
+    def _measure_stream(content, view):
+        size = 0
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+        registry.observe('http_response_size_bytes', (view,), size)
+
+    @staticmethod
+    async def _ameasure_stream(content, view):
+        size = 0
+        async for chunk in content:
+            size += len(chunk)
+            yield chunk
+        registry.observe('http_response_size_bytes', (view,), size)
+
+
+class ReplicaRoutingMiddleware:
+    """Pick a replica for GET requests to views marked with ``replica_reads``.
+
+    A request that writes (any unsafe method) sets a short-lived cookie, and
+    while it is present that browser reads from the primary, so it always
+    sees its own changes before the replicas have caught up.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.pin_after_write(request, response)
+
+    async def __acall__(self, request):
+        token = read_alias.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.pin_after_write(request, response)
+
+    def pin_after_write(self, request, response):
+        if settings.DATABASE_REPLICAS and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (settings.DATABASE_REPLICAS and getattr(view_func, 'replica_reads', False)
+                and request.method in ('GET', 'HEAD') and PIN_COOKIE not in request.COOKIES):
+            read_alias.set(random.choice(settings.DATABASE_REPLICAS))
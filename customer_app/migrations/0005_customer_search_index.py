@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# External-content FTS5 index over the searchable Customer columns. Triggers
+# keep it in sync with every INSERT/UPDATE/DELETE on the customer table,
+# including bulk_create and QuerySet.update()/delete().
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE customer_app_customer_fts USING fts5(
+        first_name, last_name, email, phone, city, state, country,
+        content='customer_app_customer', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER customer_app_customer_fts_ai AFTER INSERT ON customer_app_customer BEGIN
+        INSERT INTO customer_app_customer_fts(rowid, first_name, last_name, email, phone, city, state, country)
+        VALUES (new.id, new.first_name, new.last_name, new.email, new.phone, new.city, new.state, new.country);
+    END
+    """,
+    """
+    CREATE TRIGGER customer_app_customer_fts_ad AFTER DELETE ON customer_app_customer BEGIN
+        INSERT INTO customer_app_customer_fts(customer_app_customer_fts, rowid, first_name, last_name, email, phone, city, state, country)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.phone, old.city, old.state, old.country);
+    END
+    """,
+    """
+    CREATE TRIGGER customer_app_customer_fts_au
+    AFTER UPDATE OF first_name, last_name, email, phone, city, state, country ON customer_app_customer BEGIN
+        INSERT INTO customer_app_customer_fts(customer_app_customer_fts, rowid, first_name, last_name, email, phone, city, state, country)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.phone, old.city, old.state, old.country);
+        INSERT INTO customer_app_customer_fts(rowid, first_name, last_name, email, phone, city, state, country)
+        VALUES (new.id, new.first_name, new.last_name, new.email, new.phone, new.city, new.state, new.country);
+    END
+    """,
+    "INSERT INTO customer_app_customer_fts(customer_app_customer_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS customer_app_customer_fts_au",
+    "DROP TRIGGER IF EXISTS customer_app_customer_fts_ad",
+    "DROP TRIGGER IF EXISTS customer_app_customer_fts_ai",
+    "DROP TABLE IF EXISTS customer_app_customer_fts",
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_app', '0004_customer_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
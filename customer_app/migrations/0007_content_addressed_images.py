@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-17 02:14
+
+import customer_app.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_app', '0006_customer_image_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=customer_app.storage.ContentAddressedStorage(), upload_to='customers/'),
+        ),
+    ]
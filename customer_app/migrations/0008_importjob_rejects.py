@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-17 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_app', '0007_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='reject_report',
+            field=models.FileField(blank=True, upload_to='imports/rejects/'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_rejected',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
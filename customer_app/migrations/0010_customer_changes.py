@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-17 02:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_app', '0009_import_upsert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('customer_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['updated_at', 'id'], name='customer_updated_id_idx'),
+        ),
+    ]
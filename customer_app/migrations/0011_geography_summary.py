@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-17 02:38
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_summary(apps, schema_editor):
+    Customer = apps.get_model('customer_app', 'Customer')
+    GeographySummary = apps.get_model('customer_app', 'GeographySummary')
+    rows = Customer.objects.order_by().values('country', 'state', 'city').annotate(customers=Count('id'))
+    GeographySummary.objects.bulk_create((GeographySummary(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_app', '0010_customer_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeographySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country', models.CharField(blank=True, max_length=100)),
+                ('state', models.CharField(blank=True, max_length=100)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('customers', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='geographysummary',
+            constraint=models.UniqueConstraint(fields=('country', 'state', 'city'), name='geography_summary_unique'),
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,197 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+import django.db.models.deletion
+import customer_app.locations
+
+LOCATIONS = [('city', 'City'), ('state', 'State'), ('country', 'Country')]
+
+# The search index moves from external content (which reads the text
+# columns straight from the customer table) to a contentless FTS5 table fed
+# by triggers that look the location names up.
+OLD_FTS_SQL = [
+    "DROP TRIGGER IF EXISTS customer_app_customer_fts_au",
+    "DROP TRIGGER IF EXISTS customer_app_customer_fts_ad",
+    "DROP TRIGGER IF EXISTS customer_app_customer_fts_ai",
+    "DROP TABLE IF EXISTS customer_app_customer_fts",
+]
+
+NEW_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE customer_app_customer_fts USING fts5(
+        first_name, last_name, email, phone, city, state, country,
+        content='', prefix='2 3'
+    )
+    """,
+]
+
+RESTORE_OLD_FTS_SQL = OLD_FTS_SQL + [
+    """
+    CREATE VIRTUAL TABLE customer_app_customer_fts USING fts5(
+        first_name, last_name, email, phone, city, state, country,
+        content='customer_app_customer', content_rowid='id', prefix='2 3'
+    )
+    """,
+    "INSERT INTO customer_app_customer_fts(customer_app_customer_fts) VALUES ('rebuild')",
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    from customer_app.search import REBUILD_SQL, TRIGGER_SQL
+    for statement in NEW_FTS_SQL + TRIGGER_SQL + REBUILD_SQL:
+        schema_editor.execute(statement)
+
+
+def intern_names(apps, schema_editor):
+    Customer = apps.get_model('customer_app', 'Customer')
+    for field, model_name in LOCATIONS:
+        Location = apps.get_model('customer_app', model_name)
+        names = Customer.objects.exclude(**{field: ''}).order_by().values_list(field, flat=True).distinct()
+        Location.objects.bulk_create((Location(name=name) for name in names.iterator()), batch_size=1000)
+        Customer.objects.exclude(**{field: ''}).update(**{
+            f'{field}_ref': Subquery(Location.objects.filter(name=OuterRef(field)).values('id')[:1]),
+        })
+
+
+def restore_names(apps, schema_editor):
+    Customer = apps.get_model('customer_app', 'Customer')
+    for field, model_name in LOCATIONS:
+        Location = apps.get_model('customer_app', model_name)
+        Customer.objects.filter(**{f'{field}_ref__isnull': False}).update(**{
+            field: Subquery(Location.objects.filter(id=OuterRef(f'{field}_ref')).values('name')[:1]),
+        })
+
+
+def clear_summary(apps, schema_editor):
+    apps.get_model('customer_app', 'GeographySummary').objects.all().delete()
+
+
+def rebuild_named_summary(apps, schema_editor):
+    Customer = apps.get_model('customer_app', 'Customer')
+    GeographySummary = apps.get_model('customer_app', 'GeographySummary')
+    rows = Customer.objects.order_by().values('country', 'state', 'city').annotate(customers=Count('id'))
+    GeographySummary.objects.bulk_create((GeographySummary(**row) for row in rows.iterator()), batch_size=1000)
+
+
+def rebuild_summary(apps, schema_editor):
+    Customer = apps.get_model('customer_app', 'Customer')
+    GeographySummary = apps.get_model('customer_app', 'GeographySummary')
+    rows = Customer.objects.order_by().values('country', 'state', 'city').annotate(customers=Count('id'))
+    GeographySummary.objects.bulk_create(
+        (GeographySummary(country_id=row['country'], state_id=row['state'], city_id=row['city'],
+                          customers=row['customers']) for row in rows.iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_app', '0011_geography_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(OLD_FTS_SQL), run_sqlite(RESTORE_OLD_FTS_SQL)),
+        migrations.RunPython(clear_summary, rebuild_named_summary),
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'cities',
+            },
+        ),
+        migrations.CreateModel(
+            name='Country',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'countries',
+            },
+        ),
+        migrations.CreateModel(
+            name='State',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='city_ref',
+            field=customer_app.locations.LocationField(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='customer_app.city'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='state_ref',
+            field=customer_app.locations.LocationField(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='customer_app.state'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='country_ref',
+            field=customer_app.locations.LocationField(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='customer_app.country'),
+        ),
+        migrations.RunPython(intern_names, restore_names),
+        migrations.RemoveField(model_name='customer', name='city'),
+        migrations.RemoveField(model_name='customer', name='state'),
+        migrations.RemoveField(model_name='customer', name='country'),
+        migrations.RenameField(model_name='customer', old_name='city_ref', new_name='city'),
+        migrations.RenameField(model_name='customer', old_name='state_ref', new_name='state'),
+        migrations.RenameField(model_name='customer', old_name='country_ref', new_name='country'),
+        migrations.AlterField(
+            model_name='customer',
+            name='city',
+            field=customer_app.locations.LocationField(on_delete=django.db.models.deletion.PROTECT, to='customer_app.city'),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='state',
+            field=customer_app.locations.LocationField(on_delete=django.db.models.deletion.PROTECT, to='customer_app.state'),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='country',
+            field=customer_app.locations.LocationField(on_delete=django.db.models.deletion.PROTECT, to='customer_app.country'),
+        ),
+        migrations.RemoveConstraint(model_name='geographysummary', name='geography_summary_unique'),
+        migrations.RemoveField(model_name='geographysummary', name='city'),
+        migrations.RemoveField(model_name='geographysummary', name='state'),
+        migrations.RemoveField(model_name='geographysummary', name='country'),
+        migrations.AddField(
+            model_name='geographysummary',
+            name='city',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='customer_app.city'),
+        ),
+        migrations.AddField(
+            model_name='geographysummary',
+            name='state',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='customer_app.state'),
+        ),
+        migrations.AddField(
+            model_name='geographysummary',
+            name='country',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='customer_app.country'),
+        ),
+        migrations.AddConstraint(
+            model_name='geographysummary',
+            constraint=models.UniqueConstraint(fields=('country', 'state', 'city'), name='geography_summary_unique'),
+        ),
+        migrations.RunPython(rebuild_summary, clear_summary),
+        migrations.RunPython(create_search_index, run_sqlite(OLD_FTS_SQL)),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-17 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_app', '0012_location_lookups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserListVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,5 +1,40 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+
+from .locations import LocationField
+from .storage import ContentAddressedStorage
+
+
+class Location(models.Model):
+    """An interned place name, stored once and referenced by id.
+
+    Rows are only ever added, never renamed or deleted, so their ids can be
+    cached for the life of the process (see ``customer_app.locations``).
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.name
+
+
+class Country(Location):
+    class Meta:
+        verbose_name_plural = 'countries'
+
+
+class State(Location):
+    pass
+
+
+class City(Location):
+    class Meta:
+        verbose_name_plural = 'cities'
 
 
 class Customer(models.Model):
@@ -7,15 +42,141 @@ class Customer(models.Model):
     last_name = models.CharField(max_length=100, blank=True)
     email = models.EmailField(blank=True)
     phone = models.CharField(max_length=30, blank=True)
-    city = models.CharField(max_length=100, blank=True)
-    state = models.CharField(max_length=100, blank=True)
-    country = models.CharField(max_length=100, blank=True)
-    image = models.ImageField(upload_to='customers/', blank=True, null=True)
+    city = LocationField(City)
+    state = LocationField(State)
+    country = LocationField(Country)
+    image = models.ImageField(upload_to='customers/', storage=ContentAddressedStorage(), blank=True, null=True)
+    image_hash = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='customer_created_id_idx'),
+            models.Index(Lower('email'), name='customer_email_lower_idx'),
+            models.Index(fields=['phone'], name='customer_phone_idx'),
+            models.Index(fields=['updated_at', 'id'], name='customer_updated_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}".strip()
-    
-    
\ No newline at end of file
+
+
+class CustomerTombstone(models.Model):
+    """Records a deleted customer so change-feed consumers can drop it too."""
+
+    customer_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Customer #{self.customer_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class GeographySummary(models.Model):
+    """Customer count per (country, state, city), kept current incrementally.
+
+    Maintained by ``customer_app.geography``; rebuild it from scratch with
+    ``manage.py rebuild_geography_summary``.
+    """
+
+    country = models.ForeignKey(Country, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    state = models.ForeignKey(State, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    city = models.ForeignKey(City, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    customers = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['country', 'state', 'city'], name='geography_summary_unique'),
+        ]
+
+    def __str__(self):
+        return f"{', '.join(str(p) for p in (self.city, self.state, self.country) if p) or 'Unknown'}: {self.customers}"
+
+
+class ImportJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    MODE_INSERT = 'insert'
+    MODE_UPSERT = 'upsert'
+    MODE_CHOICES = [
+        (MODE_INSERT, 'Insert all rows'),
+        (MODE_UPSERT, 'Update existing customers (match by email, then phone)'),
+    ]
+
+    file = models.FileField(upload_to='imports/')
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default=MODE_INSERT)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_updated = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    rows_per_second = models.FloatField(default=0)
+    reject_report = models.FileField(upload_to='imports/rejects/', blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import #{self.pk} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in (self.STATUS_PENDING, self.STATUS_RUNNING)
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'file': self.file.name,
+            'status': self.status,
+            'mode': self.mode,
+            'rows_processed': self.rows_processed,
+            'rows_updated': self.rows_updated,
+            'rows_rejected': self.rows_rejected,
+            'reject_report': self.reject_report.url if self.reject_report else None,
+            'rows_per_second': round(self.rows_per_second, 1),
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class MediaBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
+class UserListVersion(models.Model):
+    """Single row counting changes to users, for the user list's ETag.
+
+    Users carry no modification time, so saves and deletes bump this
+    instead (see ``customer_app.signals``).
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        if not cls.objects.filter(pk=1).update(version=models.F('version') + 1):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1})
+
+    def __str__(self):
+        return f"User list version {self.version}"
@@ -0,0 +1,116 @@
+import re
+
+import pandas as pd
+
+CUSTOMER_FIELDS = ['first_name', 'last_name', 'email', 'phone', 'city', 'state', 'country']
+
+# Spreadsheet headers are compared after lower-casing and dropping spaces,
+# underscores and hyphens, so "First Name", "first_name" and "FirstName"
+# all resolve to first_name.
+HEADER_ALIASES = {
+    'first_name': ['firstname', 'first', 'fname', 'givenname', 'name'],
+    'last_name': ['lastname', 'last', 'lname', 'surname', 'familyname'],
+    'email': ['email', 'emailaddress', 'mail', 'emailid'],
+    'phone': ['phone', 'phonenumber', 'phoneno', 'mobile', 'mobilenumber', 'mobileno',
+              'contact', 'contactnumber', 'tel', 'telephone'],
+    'city': ['city', 'town'],
+    'state': ['state', 'province', 'region'],
+    'country': ['country', 'nation'],
+}
+
+COUNTRY_ALIASES = {
+    'us': 'United States', 'usa': 'United States', 'u.s.': 'United States', 'u.s.a.': 'United States',
+    'united states of america': 'United States',
+    'uk': 'United Kingdom', 'u.k.': 'United Kingdom', 'great britain': 'United Kingdom',
+    'uae': 'United Arab Emirates', 'u.a.e.': 'United Arab Emirates',
+    'in': 'India', 'ind': 'India', 'bharat': 'India',
+}
+
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+MAX_LENGTHS = {
+    'first_name': 100, 'last_name': 100, 'email': 254, 'phone': 30,
+    'city': 100, 'state': 100, 'country': 100,
+}
+
+
+def _header_key(value):
+    return re.sub(r'[\s_\-]+', '', str(value or '')).lower()
+
+
+def resolve_headers(header):
+    """Map sheet column positions to Customer fields, once per file.
+
+    The first column matching a field wins; unknown columns are ignored.
+    """
+    lookup = {alias: field for field, aliases in HEADER_ALIASES.items() for alias in aliases}
+    columns = {}
+    for index, value in enumerate(header):
+        field = lookup.get(_header_key(value))
+        if field and field not in columns.values():
+            columns[index] = field
+    return columns
+
+
+def _text(column):
+    return column.astype('string').str.strip().str.replace(r'\s+', ' ', regex=True).fillna('')
+
+
+def normalize_phone(column):
+    """Return ``(phones, invalid)`` for a raw phone column.
+
+    Numeric cells lose the ``.0`` Excel gives them, separators are dropped
+    and a leading ``+`` is kept.
+    """
+    text = _text(column).str.replace(r'\.0+$', '', regex=True)
+    digits = text.str.replace(r'\D', '', regex=True)
+    phones = digits.where(~text.str.startswith('+'), '+' + digits)
+    invalid = (text != '') & (
+        text.str.contains(r'[A-Za-z]', regex=True) | ~digits.str.len().between(7, 15)
+    )
+    return phones, invalid
+
+
+def normalize_email(column):
+    emails = _text(column).str.lower()
+    invalid = (emails != '') & ~emails.str.match(EMAIL_PATTERN)
+    return emails, invalid
+
+
+def normalize_country(column):
+    countries = _text(column)
+    canonical = countries.str.lower().map(COUNTRY_ALIASES).astype('string')
+    return canonical.fillna(countries.str.title())
+
+
+def normalize_frame(frame):
+    """Split a batch of raw rows into ``(clean, rejects)`` DataFrames.
+
+    Every step works on whole columns. ``clean`` has one string column per
+    Customer field; ``rejects`` keeps the raw values of the rows that failed
+    validation plus a ``reason`` column. Both keep the input index (the sheet
+    row numbers).
+    """
+    frame = frame.reindex(columns=CUSTOMER_FIELDS)
+    clean = pd.DataFrame(index=frame.index)
+    for name in ('first_name', 'last_name', 'city', 'state'):
+        clean[name] = _text(frame[name])
+    clean['email'], bad_email = normalize_email(frame['email'])
+    clean['phone'], bad_phone = normalize_phone(frame['phone'])
+    clean['country'] = normalize_country(frame['country'])
+
+    checks = {
+        'first name is required': clean['first_name'] == '',
+        'invalid email': bad_email,
+        'invalid phone': bad_phone,
+    }
+    for name, limit in MAX_LENGTHS.items():
+        checks[f'{name} longer than {limit} characters'] = clean[name].str.len() > limit
+
+    reason = pd.Series('', index=frame.index, dtype='string')
+    for message, failed in checks.items():
+        reason = reason.str.cat(failed.map({True: f'{message}; ', False: ''}).astype('string'))
+    rejected = reason != ''
+
+    rejects = frame[rejected].copy()
+    rejects['reason'] = reason[rejected].str.rstrip('; ')
+    return clean.loc[~rejected, CUSTOMER_FIELDS], rejects
@@ -0,0 +1,86 @@
+import base64
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class KeysetPage:
+    items: list = field(default_factory=list)
+    page_size: int = 0
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def encode_cursor(obj):
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the ``(created_at, pk)`` pair stored in ``cursor``.
+
+    Raises ``ValueError`` for anything that is not a cursor produced by
+    ``encode_cursor``.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f'Invalid cursor: {cursor!r}') from e
+
+
+def keyset_query(queryset, page_size, after=None, before=None):
+    """Return the sliced queryset that fetches one keyset page (plus one row).
+
+    Pass the rows it yields to ``keyset_page``. Split out so sync and async
+    callers can evaluate the same query their own way.
+    """
+    if before:
+        created_at, pk = decode_cursor(before)
+        return (queryset.filter(created_at__gte=created_at)
+                .exclude(created_at=created_at, id__lte=pk)
+                .order_by('created_at', 'id')[:page_size + 1])
+    if after:
+        created_at, pk = decode_cursor(after)
+        queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+    return queryset.order_by('-created_at', '-id')[:page_size + 1]
+
+
+def keyset_page(rows, page_size, after=None, before=None):
+    if before:
+        has_prev = len(rows) > page_size
+        items = rows[:page_size][::-1]
+        return KeysetPage(
+            items=items,
+            page_size=page_size,
+            next_cursor=encode_cursor(items[-1]) if items else None,
+            prev_cursor=encode_cursor(items[0]) if has_prev else None,
+        )
+    has_next = len(rows) > page_size
+    items = rows[:page_size]
+    return KeysetPage(
+        items=items,
+        page_size=page_size,
+        next_cursor=encode_cursor(items[-1]) if has_next else None,
+        prev_cursor=encode_cursor(items[0]) if after and items else None,
+    )
+
+
+def keyset_paginate(queryset, page_size, after=None, before=None):
+    """Page through ``queryset`` newest first on ``(created_at, id)``.
+
+    ``after`` returns the page that follows the row the cursor points at,
+    ``before`` the page that precedes it. Each page is a single range scan
+    on the ``(created_at, id)`` index, so deep pages cost the same as the
+    first one.
+    """
+    rows = list(keyset_query(queryset, page_size, after, before))
+    return keyset_page(rows, page_size, after, before)
+
+
+async def akeyset_paginate(queryset, page_size, after=None, before=None):
+    """Async ``keyset_paginate`` using the async ORM."""
+    rows = [row async for row in keyset_query(queryset, page_size, after, before)]
+    return keyset_page(rows, page_size, after, before)
@@ -0,0 +1,222 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from types import SimpleNamespace
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+
+from .locations import LOCATION_FIELDS
+from .thumbnails import thumbnail_path
+
+try:
+    from pypdf import PdfWriter
+except ImportError:
+    PdfWriter = None
+
+RECORD_FIELDS = ['first_name', 'last_name', 'email', 'phone', 'city', 'state', 'country']
+
+
+class StreamingStory(list):
+    """A story list that pulls flowables from an iterator as it drains.
+
+    ``SimpleDocTemplate.build`` consumes flowables from the front of the list
+    and checks ``len()`` before each one, so topping the list up there keeps
+    only a small window of flowables in memory instead of the whole story.
+    Finished pages are still held by the canvas until the document is saved.
+    """
+
+    def __init__(self, flowables, window=64):
+        super().__init__()
+        self._source = iter(flowables)
+        self._window = window
+
+    def __len__(self):
+        if list.__len__(self) < self._window // 2:
+            self.extend(islice(self._source, self._window))
+        return list.__len__(self)
+
+
+def new_document(file):
+    return SimpleDocTemplate(file, pagesize=letter,
+                             rightMargin=40, leftMargin=40, topMargin=60, bottomMargin=40)
+
+
+def customer_image_path(customer, size_name='pdf'):
+    return thumbnail_path(customer.image, customer.image_hash, size_name)
+
+
+def customer_card(customer, image_path, styles, image_size=80, label_color=colors.darkblue):
+    """Return the image + details table flowables for one customer."""
+    if image_path:
+        try:
+            img = Image(image_path, width=image_size, height=image_size)
+        except Exception:
+            img = Paragraph("No Image", styles["Normal"])
+    else:
+        img = Paragraph("No Image", styles["Normal"])
+
+    details = [
+        ["Name:", f"{customer.first_name} {customer.last_name}"],
+        ["Email:", customer.email or "—"],
+        ["Phone:", customer.phone or "—"],
+        ["Address:", f"{customer.city or ''}, {customer.state or ''}, {customer.country or ''}"],
+    ]
+    table_style = [
+        ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
+        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
+    ]
+    if label_color:
+        table_style.append(("TEXTCOLOR", (0, 0), (0, -1), label_color))
+    table = Table(details, colWidths=[80, 350])
+    table.setStyle(TableStyle(table_style))
+
+    profile_row = Table([[img, table]], colWidths=[image_size + 10, 400])
+    profile_row.setStyle(TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
+    ]))
+    return [profile_row, Spacer(1, 20)]
+
+
+def report_queryset(customers):
+    """``customers`` in report order, with their locations joined in."""
+    return customers.select_related(*LOCATION_FIELDS).order_by("first_name")
+
+
+def build_customers_report(customers, file, title="Customers Report"):
+    """Render the customers report for ``customers`` into ``file``.
+
+    ``customers`` may be any iterable, typically ``queryset.iterator()``;
+    it is consumed lazily while the document is laid out, so neither the
+    customers nor their flowables are all in memory at once. ReportLab keeps
+    every finished page until the document is saved, though, so memory
+    still grows with the length of the report.
+    """
+    styles = getSampleStyleSheet()
+
+    def story():
+        if title:
+            yield Paragraph(f"<b>{title}</b>", styles["Title"])
+            yield Spacer(1, 20)
+        for c in customers:
+            yield from customer_card(c, customer_image_path(c), styles)
+
+    new_document(file).build(StreamingStory(story()))
+
+
+def build_customer_profile(customer, file):
+    styles = getSampleStyleSheet()
+    story = [Paragraph("<b>Customer Profile</b>", styles["Title"]), Spacer(1, 20)]
+    story.extend(customer_card(customer, customer_image_path(customer, 'profile'), styles,
+                               image_size=100, label_color=None))
+    new_document(file).build(story)
+
+
+def parallel_available():
+    return PdfWriter is not None
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def report_pool(workers):
+    """The process pool shared by every report, started on first use.
+
+    Each spawned worker pays for an interpreter start and a ReportLab import,
+    so workers are kept for the life of the process instead of per report.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawned workers only import ReportLab; forking a threaded server is unsafe.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def customer_records(queryset, chunk_size=2000):
+    """Yield picklable customer dicts, with resolved image paths, for pool workers."""
+    customers = (queryset.select_related(*LOCATION_FIELDS).only(*RECORD_FIELDS, 'image', 'image_hash')
+                 .iterator(chunk_size=chunk_size))
+    for customer in customers:
+        record = {name: str(getattr(customer, name) or '') for name in RECORD_FIELDS}
+        record['image_path'] = customer_image_path(customer)
+        yield record
+
+
+def render_report_chunk(records, title, directory):
+    """Process-pool worker: lay out one chunk of records into its own PDF file."""
+    styles = getSampleStyleSheet()
+    story = []
+    if title:
+        story += [Paragraph(f"<b>{title}</b>", styles["Title"]), Spacer(1, 20)]
+    for record in records:
+        story += customer_card(SimpleNamespace(**record), record['image_path'], styles)
+    fd, path = tempfile.mkstemp(suffix='.pdf', dir=directory)
+    with os.fdopen(fd, 'wb') as chunk_file:
+        new_document(chunk_file).build(story)
+    return path
+
+
+def build_customers_report_parallel(records, file, workers, chunk_size=500, title="Customers Report"):
+    """Render the customers report across a process pool and merge the parts.
+
+    ``records`` come from ``customer_records`` in report order. They are cut
+    into chunks of ``chunk_size``, each chunk is laid out by a worker into a
+    partial PDF, and the partial PDFs are concatenated in chunk order, so
+    every chunk starts on a new page. Only ``2 * workers`` chunks are in
+    flight at once. Requires pypdf.
+
+    The merged document is held in a ``PdfWriter`` until it is written,
+    which takes somewhat more memory per page than ``build_customers_report``,
+    so callers limit it to reports of moderate size.
+    """
+    if PdfWriter is None:
+        raise RuntimeError('Parallel PDF rendering requires the pypdf package.')
+
+    records = iter(records)
+    writer = PdfWriter()
+    pool = report_pool(workers)
+    with tempfile.TemporaryDirectory() as directory:
+        pending = []
+        chunk_title = title
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    chunk = list(islice(records, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(pool.submit(render_report_chunk, chunk, chunk_title, directory))
+                    chunk_title = None
+                if not pending:
+                    break
+                path = pending.pop(0).result()
+                writer.append(path)
+                os.remove(path)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+        writer.write(file)
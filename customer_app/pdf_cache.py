@@ -0,0 +1,101 @@
+import glob
+import os
+import tempfile
+
+from django.conf import settings
+
+from .pdf import build_customer_profile
+
+
+def _cache_dir():
+    return str(settings.CUSTOMER_PDF_CACHE_DIR)
+
+
+def profile_version(pk, updated_at):
+    return f'{pk}-{int(updated_at.timestamp() * 1_000_000)}'
+
+
+def cached_profile_pdf(customer):
+    """Return the customer's profile PDF opened for reading, rendering it on a miss.
+
+    Entries are keyed by ``pk`` and ``updated_at``, so an edited customer
+    never gets a stale file. Hits refresh the file's mtime, which is what
+    ``evict`` uses as the LRU clock. The file is returned open, so it can
+    still be read if a concurrent ``evict`` unlinks it.
+    """
+    directory = _cache_dir()
+    path = os.path.join(directory, f'{profile_version(customer.pk, customer.updated_at)}.pdf')
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        pass
+    else:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return file
+
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    file = None
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            build_customer_profile(customer, out)
+        file = open(tmp_path, 'rb')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if file:
+            file.close()
+        os.remove(tmp_path)
+        raise
+    evict()
+    return file
+
+
+def invalidate(pk):
+    for path in glob.glob(os.path.join(_cache_dir(), f'{pk}-*.pdf')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def invalidate_many(pks):
+    """``invalidate`` for many customers with one directory scan."""
+    prefixes = {f'{pk}-' for pk in pks}
+    try:
+        entries = list(os.scandir(_cache_dir()))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.name.endswith('.pdf') and entry.name[:entry.name.find('-') + 1] in prefixes:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def evict(max_bytes=None):
+    """Delete least recently used entries until the cache fits ``max_bytes``."""
+    max_bytes = settings.CUSTOMER_PDF_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    try:
+        entries = [e for e in os.scandir(_cache_dir()) if e.name.endswith('.pdf')]
+    except FileNotFoundError:
+        return
+    stats = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue  # removed by another worker since the scan
+        stats.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in stats)
+    for _, size, path in sorted(stats):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
@@ -0,0 +1,34 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+
+read_alias = ContextVar('customer_read_alias', default=None)
+
+
+def replica_reads(view):
+    """Mark a read-only view whose customer queries may go to a replica."""
+    view.replica_reads = True
+    return view
+
+
+class ReplicaRouter:
+    """Send ``customer_app`` reads from replica-enabled views to a replica.
+
+    The alias is chosen per request by ``ReplicaRoutingMiddleware``; every
+    other read, all writes and all migrations use ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias and model._meta.app_label == 'customer_app':
+            return alias
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,136 @@
+import re
+
+from django.db import connection, connections, router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .locations import LOCATION_FIELDS
+from .models import Customer
+
+FTS_TABLE = 'customer_app_customer_fts'
+SEARCH_FIELDS = ['first_name', 'last_name', 'email', 'phone', 'city', 'state', 'country']
+LOCATION_TABLES = {'city': 'customer_app_city', 'state': 'customer_app_state', 'country': 'customer_app_country'}
+
+
+def _values(row):
+    """SQL for the indexed text of trigger row ``row`` (``new`` or ``old``)."""
+    return ', '.join(
+        f'(SELECT name FROM {LOCATION_TABLES[name]} WHERE id = {row}.{name}_id)' if name in LOCATION_TABLES
+        else f'{row}.{name}'
+        for name in SEARCH_FIELDS
+    )
+
+
+_columns = ', '.join(SEARCH_FIELDS)
+_watched = ', '.join(f'{name}_id' if name in LOCATION_TABLES else name for name in SEARCH_FIELDS)
+
+# The index is a contentless FTS5 table: it keeps only the index, and the
+# triggers hand it the text, looking the location names up. Deleting from a
+# contentless table needs the old text, which the lookups reproduce since
+# location names never change.
+#
+# SQLite drops triggers together with their table, and schema changes on
+# SQLite rebuild the customer table, so these are re-created after every
+# migrate (see ensure_search_triggers).
+TRIGGER_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON customer_app_customer BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_values('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON customer_app_customer BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_values('old')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_watched} ON customer_app_customer BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_values('old')});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_values('new')});
+    END
+    """,
+]
+
+REBUILD_SQL = [
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')",
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, {_columns})
+    SELECT new.id, {_values('new')} FROM customer_app_customer AS new
+    """,
+]
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def ensure_search_triggers(using='default', **kwargs):
+    """``post_migrate`` receiver that restores the FTS sync triggers."""
+    conn = connections[using]
+    if conn.vendor != 'sqlite' or FTS_TABLE not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cursor:
+        for statement in TRIGGER_SQL:
+            cursor.execute(statement)
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query where every word is a prefix match."""
+    return ' '.join(f'"{token}"*' for token in re.findall(r'\w+', text))
+
+
+def search_customer_ids(text, limit=50):
+    query = fts_query(text)
+    if not query:
+        return []
+    with connections[router.db_for_read(Customer)].cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s",
+            [query, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _icontains_condition(text):
+    condition = Q()
+    for token in text.split():
+        token_condition = Q()
+        for name in SEARCH_FIELDS:
+            lookup = f'{name}__name__icontains' if name in LOCATION_TABLES else f'{name}__icontains'
+            token_condition |= Q(**{lookup: token})
+        condition &= token_condition
+    return condition
+
+
+def search_customers(text, limit=50):
+    """Return up to ``limit`` customers matching ``text``, newest first.
+
+    On SQLite this reads the FTS5 index; other databases fall back to
+    ``icontains`` filters over the same columns.
+    """
+    if not fts_available():
+        return list(Customer.objects.select_related(*LOCATION_FIELDS)
+                    .filter(_icontains_condition(text)).order_by('-id')[:limit])
+
+    ids = search_customer_ids(text, limit)
+    customers = Customer.objects.select_related(*LOCATION_FIELDS).in_bulk(ids)
+    return [customers[pk] for pk in ids if pk in customers]
+
+
+def search_queryset(queryset, text):
+    """Filter ``queryset`` to every customer matching ``text``, without a limit."""
+    if not fts_available():
+        return queryset.filter(_icontains_condition(text))
+    query = fts_query(text)
+    if not query:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query]))
+
+
+def rebuild_search_index():
+    ensure_search_triggers(connection.alias)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for statement in REBUILD_SQL:
+            cursor.execute(statement)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
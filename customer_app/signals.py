@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .geography import GEOGRAPHY_COLUMNS, GEOGRAPHY_FIELDS, geography_key, record_geography_change
+from .images import ensure_webp_variant
+from .models import Customer, UserListVersion
+from .pdf_cache import invalidate as invalidate_profile_pdf
+from .thumbnails import content_hash, delete_thumbnails, ensure_thumbnails
+
+
+@receiver(pre_save, sender=Customer)
+def hash_customer_image(sender, instance, **kwargs):
+    instance._previous_image_hash = instance.image_hash
+    instance._replaced_image_name = None
+    image_changed = not instance.image or not instance.image._committed
+    if image_changed and instance.pk:
+        instance._replaced_image_name = (
+            Customer.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+        )
+    if not instance.image:
+        instance.image_hash = ''
+    elif not instance.image._committed:
+        instance.image_hash = content_hash(instance.image)
+
+
+def _release_thumbnails(image_hash):
+    if image_hash and not Customer.objects.filter(image_hash=image_hash).exists():
+        delete_thumbnails(image_hash)
+
+
+@receiver(post_save, sender=Customer)
+def refresh_customer_thumbnails(sender, instance, **kwargs):
+    if instance.image and instance.image_hash:
+        try:
+            ensure_thumbnails(instance.image, instance.image_hash)
+            ensure_webp_variant(instance.image)
+        except (OSError, ValueError):
+            pass
+    previous = getattr(instance, '_previous_image_hash', None)
+    if previous != instance.image_hash:
+        _release_thumbnails(previous)
+    # The storage counts references, so this only removes the old file when
+    # no other customer shares its content.
+    replaced = getattr(instance, '_replaced_image_name', None)
+    if replaced:
+        instance.image.storage.delete(replaced)
+
+
+@receiver(post_delete, sender=Customer)
+def release_customer_image(sender, instance, **kwargs):
+    _release_thumbnails(instance.image_hash)
+    if instance.image:
+        instance.image.storage.delete(instance.image.name)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_customer_pdf(sender, instance, **kwargs):
+    if not kwargs.get('created'):
+        invalidate_profile_pdf(instance.pk)
+
+
+@receiver(pre_save, sender=Customer)
+def remember_customer_location(sender, instance, update_fields=None, **kwargs):
+    instance._previous_location = None
+    if instance.pk and (update_fields is None or set(GEOGRAPHY_FIELDS + GEOGRAPHY_COLUMNS) & set(update_fields)):
+        instance._previous_location = (
+            Customer.objects.filter(pk=instance.pk).values_list(*GEOGRAPHY_COLUMNS).first()
+        )
+
+
+@receiver(post_save, sender=Customer)
+def update_geography_summary(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        record_geography_change(after=geography_key(instance))
+    elif getattr(instance, '_previous_location', None) is not None:
+        record_geography_change(instance._previous_location, geography_key(instance))
+
+
+@receiver(post_delete, sender=Customer)
+def remove_from_geography_summary(sender, instance, **kwargs):
+    record_geography_change(before=geography_key(instance))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_list_version(sender, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which the list does not show.
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        UserListVersion.bump()
@@ -0,0 +1,85 @@
+import os
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils.deconstruct import deconstructible
+
+from .images import webp_variant_name
+from .thumbnails import content_hash
+
+
+def content_addressed_name(directory, digest, extension):
+    return f'{directory}/{digest[:2]}/{digest}{extension.lower()}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File storage that keeps one copy of each distinct file content.
+
+    Files are stored as ``<upload dir>/<sha[:2]>/<sha><ext>``, so re-uploading
+    the same bytes yields the same name and no new file. A ``MediaBlob`` row
+    counts the references to each name; ``delete`` drops one reference and
+    only removes the file when the last one is gone.
+    """
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1]
+        name = content_addressed_name(directory, content_hash(content), extension)
+        if not self.exists(name):
+            name = super()._save(name, content)
+        webp = getattr(content, 'webp_variant', None)
+        variant = webp_variant_name(name)
+        if webp is not None and variant != name and not self.exists(variant):
+            super()._save(variant, ContentFile(webp))
+        self.acquire(name, content.size)
+        return name
+
+    def acquire(self, name, size=0, count=1):
+        MediaBlob = apps.get_model('customer_app', 'MediaBlob')
+        if MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + count):
+            return
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(name=name, size=size, refcount=count)
+        except IntegrityError:
+            MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + count)
+
+    def _drop_references(self, name, count):
+        """Drop ``count`` references to ``name``; True once none are left."""
+        if not name:
+            return False
+        MediaBlob = apps.get_model('customer_app', 'MediaBlob')
+        MediaBlob.objects.filter(name=name, refcount__gt=0).update(refcount=Greatest(F('refcount') - count, 0))
+        return bool(MediaBlob.objects.filter(name=name, refcount__lte=0).delete()[0])
+
+    def _delete_files(self, name):
+        super().delete(name)
+        if webp_variant_name(name) != name:
+            super().delete(webp_variant_name(name))
+
+    def release(self, name, count=1):
+        """Drop ``count`` references to ``name``, deleting the file after the last."""
+        if self._drop_references(name, count):
+            self._delete_files(name)
+
+    def release_on_commit(self, name, count=1):
+        """``release``, but leave the file in place until the transaction commits.
+
+        If it rolls back the references come back and the file is still
+        there. The file is kept if an upload has referenced it again since.
+        """
+        if self._drop_references(name, count):
+            MediaBlob = apps.get_model('customer_app', 'MediaBlob')
+
+            def delete_unless_reused():
+                if not MediaBlob.objects.filter(name=name).exists():
+                    self._delete_files(name)
+            transaction.on_commit(delete_unless_reused)
+
+    def delete(self, name):
+        self.release(name)
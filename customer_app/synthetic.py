@@ -0,0 +1,103 @@
+import random
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from openpyxl import Workbook
+from PIL import Image
+
+from .geography import apply_geography_deltas, count_locations
+from .images import ensure_webp_variant, optimize_upload
+from .locations import intern_locations
+from .models import Customer, MediaBlob
+from .normalize import CUSTOMER_FIELDS
+from .thumbnails import content_hash
+
+FIRST_NAMES = ['Asha', 'Ravi', 'Meera', 'Arjun', 'Divya', 'Karthik', 'Lakshmi', 'Vikram', 'Anjali', 'Rahul',
+               'Priya', 'Suresh', 'Neha', 'Arun', 'Kavya', 'John', 'Maria', 'David', 'Sara', 'Omar']
+LAST_NAMES = ['Menon', 'Kumar', 'Nair', 'Sharma', 'Iyer', 'Reddy', 'Pillai', 'Das', 'Singh', 'Patel',
+              'Thomas', 'Joseph', 'Khan', 'Smith', 'Garcia', 'Ali']
+PLACES = [
+    ('Kochi', 'Kerala', 'India'), ('Thrissur', 'Kerala', 'India'), ('Bengaluru', 'Karnataka', 'India'),
+    ('Chennai', 'Tamil Nadu', 'India'), ('Mumbai', 'Maharashtra', 'India'), ('Pune', 'Maharashtra', 'India'),
+    ('Dubai', 'Dubai', 'United Arab Emirates'), ('London', 'England', 'United Kingdom'),
+    ('Austin', 'Texas', 'United States'), ('Seattle', 'Washington', 'United States'),
+]
+SHEET_HEADER = ['First Name', 'Last Name', 'Email', 'Phone', 'City', 'State', 'Country']
+
+
+def synthetic_rows(count, seed=0, offset=0):
+    """Yield ``count`` customer field tuples in ``SHEET_HEADER`` order.
+
+    The same ``seed`` always gives the same rows; ``offset`` keeps emails
+    and phones unique across several calls.
+    """
+    rng = random.Random(seed)
+    for n in range(offset, offset + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        city, state, country = rng.choice(PLACES)
+        yield (first, last, f'{first}.{last}.{n}@example.com'.lower(), f'9{n:09d}', city, state, country)
+
+
+def write_sheet(file, count, seed=0, offset=0):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(SHEET_HEADER)
+    for row in synthetic_rows(count, seed, offset):
+        sheet.append(row)
+    workbook.save(file)
+
+
+def _synthetic_images(count, rng):
+    storage = Customer._meta.get_field('image').storage
+    images = []
+    for _ in range(count):
+        buffer = BytesIO()
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', (600, 400), color).save(buffer, format='PNG')
+        content = optimize_upload(ContentFile(buffer.getvalue(), name='synthetic.png'))
+        image_hash = content_hash(content)
+        name = storage.save(f'customers/{content.name}', content)
+        ensure_webp_variant(Customer(image=name).image)
+        images.append((name, image_hash))
+    return images
+
+
+def seed_customers(count, batch_size=5000, images=0, seed=0):
+    """Bulk insert ``count`` synthetic customers and return how many were created.
+
+    With ``images`` set, that many distinct images (at most one per customer)
+    are stored once and shared round-robin across the new customers, with
+    their reference counts set to match.
+    """
+    rng = random.Random(seed)
+    offset = Customer.objects.count()
+    images = min(images, count)
+    shared = _synthetic_images(images, rng) if images else []
+    uses = [0] * len(shared)
+    rows = synthetic_rows(count, seed, offset)
+    created = 0
+    while created < count:
+        values = []
+        for fields in rows:
+            values.append(dict(zip(CUSTOMER_FIELDS, fields)))
+            if len(values) == batch_size:
+                break
+        batch = []
+        for row in intern_locations(values):
+            customer = Customer(**row)
+            if shared:
+                index = (created + len(batch)) % len(shared)
+                customer.image, customer.image_hash = shared[index]
+                uses[index] += 1
+            batch.append(customer)
+        with transaction.atomic():
+            Customer.objects.bulk_create(batch)
+            apply_geography_deltas(count_locations(batch))
+        created += len(batch)
+
+    # storage.save already took one reference to each image.
+    for (name, _), used in zip(shared, uses):
+        MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + used - 1)
+    return created
@@ -0,0 +1,20 @@
+from django import template
+
+from customer_app.images import webp_variant_name
+from customer_app.thumbnails import thumbnail_url as _thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail_url(customer, size_name):
+    """``{{ customer|thumbnail_url:'avatar' }}`` - URL of a cached thumbnail of the customer's image."""
+    return _thumbnail_url(customer.image, customer.image_hash, size_name)
+
+
+@register.filter
+def webp_url(customer):
+    """``{{ customer|webp_url }}`` - URL of the WebP copy of the customer's image, or of the image itself."""
+    name = webp_variant_name(customer.image.name)
+    storage = customer.image.storage
+    return storage.url(name) if storage.exists(name) else customer.image.url
@@ -1,3 +1,1227 @@
-from django.test import TestCase
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import closing, contextmanager
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, connections, router, transaction
+from django.db.models.signals import post_delete
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from PIL import Image, PngImagePlugin
+
+from . import importer
+from .bulk import bulk_delete_customers
+from .db import copy_sqlite_database
+from .duplicates import find_duplicate_clusters, merge_clusters
+from .geography import rebuild_geography_summary
+from .images import optimize_image_bytes, webp_variant_name
+from .importer import import_customers
+from .jobs import fail_abandoned_jobs
+from .metrics import registry
+from .middleware import PIN_COOKIE, ReplicaRoutingMiddleware
+from .models import City, Country, Customer, CustomerTombstone, GeographySummary, ImportJob, MediaBlob, State
+from .pagination import keyset_paginate
+from .pdf import build_customers_report, report_pool, report_queryset
+from .pdf_cache import evict
+from .routers import replica_reads
+from .search import search_customers
+from .thumbnails import thumbnail_name
+from .views import spool_customers_pdf
+
+
+def make_workbook(header, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+class ImportCustomersTests(TestCase):
+    def test_rows_are_imported_in_batches(self):
+        excel = make_workbook(
+            ['first_name', 'last_name', 'email', 'phone', 'city', 'state', 'country'],
+            [[f'Name{i}', 'Doe', f'user{i}@example.com', 9876543210 + i, 'Kochi', 'Kerala', 'India']
+             for i in range(25)],
+        )
+        result = import_customers(excel, batch_size=10)
+
+        self.assertEqual(result.rows, 25)
+        self.assertEqual(result.batches, 3)
+        self.assertEqual(Customer.objects.count(), 25)
+        customer = Customer.objects.get(first_name='Name3')
+        self.assertEqual(customer.phone, '9876543213')
+        self.assertEqual(customer.email, 'user3@example.com')
+        self.assertEqual(customer.country.name, 'India')
+        self.assertEqual(Country.objects.count(), 1)
+
+    def test_locations_are_resolved_once_per_batch(self):
+        excel = make_workbook(
+            ['first_name', 'city', 'state', 'country'],
+            [[f'Name{i}', 'Kochi' if i % 2 else 'Thrissur', 'Kerala', 'India'] for i in range(40)] + [['Blank']],
+        )
+        with CaptureQueriesContext(connection) as queries:
+            import_customers(excel, batch_size=100)
+
+        city_queries = [q for q in queries if 'customer_app_city' in q['sql']]
+        self.assertEqual(len(city_queries), 3)  # look up, insert the new names, read their ids
+        self.assertEqual(sorted(City.objects.values_list('name', flat=True)), ['Kochi', 'Thrissur'])
+        self.assertEqual(Customer.objects.filter(city__name='Kochi').count(), 20)
+        self.assertIsNone(Customer.objects.get(first_name='Blank').city)
+
+    def test_title_case_headers_and_blank_cells(self):
+        excel = make_workbook(
+            ['First Name', 'Last Name', 'email', 'phone'],
+            [['Asha', None, None, None], [None, None, None, None], ['Ravi', 'K', 'ravi@example.com', '9876543210']],
+        )
+        result = import_customers(excel)
+
+        self.assertEqual(result.rows, 2)
+        asha = Customer.objects.get(first_name='Asha')
+        self.assertEqual((asha.last_name, asha.email, asha.phone), ('', '', ''))
+        self.assertEqual(Customer.objects.get(first_name='Ravi').last_name, 'K')
+
+    def test_columns_are_normalized_and_invalid_rows_rejected(self):
+        excel = make_workbook(
+            ['Given Name', 'Surname', 'E-mail', 'Mobile No', 'Country'],
+            [
+                ['Asha', 'Menon', ' Asha@Example.COM ', 9876543210.0, 'usa'],
+                ['Ravi', '', 'not-an-email', '+91 98765-43210', 'india'],
+                ['Meera', '', '', 'call me', ''],
+                [None, 'Nobody', 'x@example.com', None, None],
+            ],
+        )
+        report = StringIO()
+        result = import_customers(excel, reject_report=report)
+
+        self.assertEqual((result.rows, result.rejected), (1, 3))
+        asha = Customer.objects.get()
+        self.assertEqual((asha.email, asha.phone, asha.country.name),
+                         ('asha@example.com', '9876543210', 'United States'))
+        lines = report.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith('3,') and lines[1].endswith('invalid email'))
+        self.assertIn('invalid phone', lines[2])
+        self.assertIn('first name is required', lines[3])
+
+    def test_upsert_updates_matches_and_skips_unchanged_rows(self):
+        existing = Customer.objects.create(first_name='Asha', email='ASHA@example.com', city='Kochi')
+        by_phone = Customer.objects.create(first_name='Ravi', phone='9876543210')
+        header = ['first_name', 'email', 'phone', 'city']
+        rows = [
+            ['Asha', 'asha@example.com', None, 'Mumbai'],
+            ['Ravi', None, 9876543210, 'Delhi'],
+            ['Meera', 'meera@example.com', None, 'Pune'],
+        ]
+
+        result = import_customers(make_workbook(header, rows), mode='upsert')
+        self.assertEqual((result.rows, result.updated, result.unchanged), (1, 2, 0))
+        self.assertEqual(Customer.objects.count(), 3)
+        existing.refresh_from_db()
+        self.assertEqual((existing.email, existing.city.name), ('asha@example.com', 'Mumbai'))
+        self.assertEqual(Customer.objects.get(pk=by_phone.pk).city.name, 'Delhi')
+
+        again = import_customers(make_workbook(header, rows), mode='upsert')
+        self.assertEqual((again.rows, again.updated, again.unchanged), (0, 0, 3))
+        self.assertEqual(Customer.objects.count(), 3)
+
+
+def make_image(name='photo.png', color='red', size=(600, 400)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class TempMediaMixin:
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+
+@override_settings(CUSTOMER_IMPORT_ASYNC=False)
+class ImportJobTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('staff', password='secret')
+        self.client.force_login(self.user)
+
+    def test_upload_queues_job_and_reports_progress(self):
+        excel = make_workbook(['first_name', 'email'], [['Asha', 'asha@example.com'], ['Ravi', '']])
+        upload = SimpleUploadedFile('customers.xlsx', excel.read())
+
+        response = self.client.post(reverse('customer_bulk_upload'), {'excel_file': upload})
+
+        self.assertRedirects(response, reverse('customer_list'))
+        job = ImportJob.objects.get()
+        self.assertEqual(job.created_by, self.user)
+        self.assertEqual(Customer.objects.count(), 2)
+
+        status = self.client.get(reverse('import_job_status', args=[job.pk])).json()
+        self.assertEqual(status['status'], ImportJob.STATUS_DONE)
+        self.assertEqual(status['rows_processed'], 2)
+
+    def test_status_is_only_shown_to_the_creator_or_staff(self):
+        job = ImportJob.objects.create(created_by=self.user)
+        url = reverse('import_job_status', args=[job.pk])
+
+        self.client.force_login(User.objects.create_user('other', password='secret'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_login(User.objects.create_user('admin', password='secret', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_rejected_rows_are_saved_as_a_report(self):
+        excel = make_workbook(['first_name', 'email'], [['Asha', 'asha@example.com'], ['Ravi', 'bad']])
+        self.client.post(reverse('customer_bulk_upload'),
+                         {'excel_file': SimpleUploadedFile('customers.xlsx', excel.read())})
+
+        job = ImportJob.objects.get()
+        self.assertEqual((job.rows_processed, job.rows_rejected), (1, 1))
+        with job.reject_report.open('r') as report:
+            self.assertIn('3,Ravi,,bad,,,,,invalid email', report.read())
+
+    def test_unreadable_file_marks_job_failed(self):
+        upload = SimpleUploadedFile('customers.xlsx', b'not a workbook')
+
+        self.client.post(reverse('customer_bulk_upload'), {'excel_file': upload})
+
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertTrue(job.error)
+        self.assertFalse(job.file)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'imports')), [])
+
+    def test_imported_upload_is_deleted(self):
+        excel = make_workbook(['first_name', 'email'], [['Asha', 'asha@example.com']])
+        self.client.post(reverse('customer_bulk_upload'),
+                         {'excel_file': SimpleUploadedFile('customers.xlsx', excel.read())})
+
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertFalse(job.file)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'imports')), [])
+
+    def test_abandoned_jobs_are_failed(self):
+        upload = SimpleUploadedFile('customers.xlsx', b'workbook')
+        stale = [ImportJob.objects.create(file=upload, status=status)
+                 for status in (ImportJob.STATUS_PENDING, ImportJob.STATUS_RUNNING)]
+        fresh = ImportJob.objects.create(status=ImportJob.STATUS_RUNNING)
+        done = ImportJob.objects.create(status=ImportJob.STATUS_DONE)
+        ImportJob.objects.exclude(pk=fresh.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(fail_abandoned_jobs(), 2)
+
+        statuses = dict(ImportJob.objects.values_list('pk', 'status'))
+        self.assertEqual([statuses[job.pk] for job in stale], [ImportJob.STATUS_FAILED] * 2)
+        self.assertEqual((statuses[fresh.pk], statuses[done.pk]), (ImportJob.STATUS_RUNNING, ImportJob.STATUS_DONE))
+        self.assertFalse(any(job.file.storage.exists(job.file.name) for job in stale))
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        Customer.objects.bulk_create(Customer(first_name=f'C{i}') for i in range(7))
+        # Identical timestamps force the id tie-breaker to do the work.
+        Customer.objects.update(created_at=Customer.objects.first().created_at)
+        self.expected = list(Customer.objects.order_by('-created_at', '-id'))
+
+    def test_pages_forward_and_back(self):
+        first = keyset_paginate(Customer.objects.all(), 3)
+        second = keyset_paginate(Customer.objects.all(), 3, after=first.next_cursor)
+        third = keyset_paginate(Customer.objects.all(), 3, after=second.next_cursor)
+
+        self.assertEqual(first.items + second.items + third.items, self.expected)
+        self.assertIsNone(first.prev_cursor)
+        self.assertIsNone(third.next_cursor)
+
+        back = keyset_paginate(Customer.objects.all(), 3, before=third.prev_cursor)
+        self.assertEqual(back.items, second.items)
+        self.assertEqual(keyset_paginate(Customer.objects.all(), 3, before=back.prev_cursor).items, first.items)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        self.client.force_login(User.objects.create_user('staff'))
+        response = self.client.get(reverse('customer_list'), {'after': 'garbage', 'page_size': 2})
+
+        self.assertEqual(list(response.context['customers']), self.expected[:2])
+
+
+class CustomerSearchTests(TestCase):
+    def test_index_follows_create_edit_delete_and_bulk_insert(self):
+        asha = Customer.objects.create(first_name='Asha', last_name='Menon', city='Kochi')
+        Customer.objects.bulk_create([Customer(first_name='Ravi', email='ravi@example.com')])
+
+        self.assertEqual(search_customers('ash'), [asha])
+        self.assertEqual([c.first_name for c in search_customers('ravi@exa')], ['Ravi'])
+
+        asha.city = 'Mumbai'
+        asha.save()
+        self.assertEqual(search_customers('kochi'), [])
+        self.assertEqual(search_customers('asha mum'), [asha])
+
+        asha.delete()
+        self.assertEqual(search_customers('asha'), [])
+
+    def test_search_endpoint_returns_json(self):
+        Customer.objects.create(first_name='Asha', email='asha@example.com')
+        self.client.force_login(User.objects.create_user('staff'))
+
+        results = self.client.get(reverse('customer_search'), {'q': 'as'}).json()['results']
+
+        self.assertEqual([r['email'] for r in results], ['asha@example.com'])
+
+    def test_location_names_are_only_looked_up_on_save(self):
+        self.client.force_login(User.objects.create_user('staff'))
+        self.client.post(reverse('customer_add'), {'first_name': 'Asha', 'email': 'not-an-email', 'city': 'Nowhere'})
+        self.assertFalse(City.objects.exists())
+
+        with self.assertNumQueries(0):
+            asha = Customer(first_name='Asha', city='Kochi')
+            self.assertEqual((asha.city.name, asha.city_id), ('Kochi', None))
+        asha.save()
+        self.assertEqual(asha.city, City.objects.get(name='Kochi'))
+
+    def test_search_endpoint_clamps_the_limit(self):
+        for name in ('Asha', 'Ashok', 'Ashwin'):
+            Customer.objects.create(first_name=name)
+        self.client.force_login(User.objects.create_user('staff'))
+
+        for limit, expected in (('-5', 1), ('0', 1), ('2', 2), ('x', 3)):
+            results = self.client.get(reverse('customer_search'), {'q': 'ash', 'limit': limit}).json()['results']
+            self.assertEqual(len(results), expected, limit)
+
+    def test_form_edits_locations_by_name(self):
+        asha = Customer.objects.create(first_name='Asha', city='Kochi', country='India')
+        self.client.force_login(User.objects.create_user('staff'))
+
+        response = self.client.get(reverse('customer_edit', args=[asha.pk]))
+        self.assertContains(response, 'value="Kochi"')
+        self.client.post(reverse('customer_edit', args=[asha.pk]),
+                         {'first_name': 'Asha', 'city': 'Mumbai', 'country': ''})
+
+        asha.refresh_from_db()
+        self.assertEqual((asha.city.name, asha.country), ('Mumbai', None))
+        self.assertEqual(search_customers('mumbai'), [asha])
+        results = self.client.get(reverse('customer_search'), {'q': 'mumbai'}).json()['results']
+        self.assertEqual((results[0]['city'], results[0]['country']), ('Mumbai', ''))
+
+
+class CustomerPdfTests(TestCase):
+    def setUp(self):
+        Customer.objects.bulk_create(Customer(first_name=f'C{i:03}', email=f'c{i}@example.com') for i in range(120))
+        self.client.force_login(User.objects.create_user('staff'))
+
+    def test_report_is_streamed_from_spool_file(self):
+        response = self.client.get(reverse('download_customers_pdf'))
+        body = b''.join(response.streaming_content)
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertGreater(body.count(b'/Type /Page\n'), 1)
+
+    @override_settings(CUSTOMER_PDF_WORKERS=2, CUSTOMER_PDF_CHUNK_SIZE=50)
+    def test_parallel_report_merges_chunks_in_order(self):
+        from pypdf import PdfReader
+
+        response = self.client.get(reverse('download_customers_pdf'))
+        reader = PdfReader(BytesIO(b''.join(response.streaming_content)))
+        text = ''.join(page.extract_text() for page in reader.pages)
+
+        self.assertLess(text.index('C000'), text.index('C050'))
+        self.assertLess(text.index('C050'), text.index('C119'))
+
+        pool = report_pool(2)
+        b''.join(self.client.get(reverse('download_customers_pdf')).streaming_content)
+        self.assertIs(report_pool(2), pool)
+
+    def test_serial_report_joins_locations(self):
+        Customer.objects.update(city=City.objects.create(name='Kochi'), country=Country.objects.create(name='India'))
+
+        with self.assertNumQueries(1), tempfile.TemporaryFile() as out:
+            build_customers_report(report_queryset(Customer.objects.all()).iterator(), out)
+
+    @override_settings(CUSTOMER_PDF_WORKERS=2, CUSTOMER_PDF_PARALLEL_MAX_RECORDS=100)
+    def test_large_reports_are_rendered_serially(self):
+        with mock.patch('customer_app.views.build_customers_report_parallel') as parallel:
+            response = self.client.get(reverse('download_customers_pdf'))
+
+        self.assertFalse(parallel.called)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_spool_is_closed_when_the_report_fails(self):
+        spools = []
+
+        def temporary_file(make=tempfile.TemporaryFile):
+            spools.append(make())
+            return spools[-1]
+
+        with mock.patch('customer_app.views.tempfile.TemporaryFile', temporary_file), \
+                mock.patch('customer_app.views.build_customers_report', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                spool_customers_pdf()
+
+        self.assertTrue(spools[0].closed)
+
+    def test_individual_profile(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        customer = Customer.objects.first()
+
+        with override_settings(CUSTOMER_PDF_CACHE_DIR=cache_dir):
+            response = self.client.get(reverse('download_customer_pdf_individual', args=[customer.pk]))
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+
+class ThumbnailTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('staff'))
+
+    def thumbnail_exists(self, image_hash, size_name):
+        return os.path.exists(os.path.join(self.media_root, thumbnail_name(image_hash, size_name)))
+
+    def test_thumbnails_follow_the_image(self):
+        self.client.post(reverse('customer_add'), {'first_name': 'Asha', 'image': make_image()})
+        customer = Customer.objects.get()
+        first_hash = customer.image_hash
+        self.assertTrue(self.thumbnail_exists(first_hash, 'pdf'))
+        with Image.open(os.path.join(self.media_root, thumbnail_name(first_hash, 'avatar'))) as thumb:
+            self.assertEqual(max(thumb.size), 40)
+
+        self.client.post(reverse('customer_edit', args=[customer.pk]),
+                         {'first_name': 'Asha', 'image': make_image(color='blue')})
+        customer.refresh_from_db()
+        self.assertNotEqual(customer.image_hash, first_hash)
+        self.assertTrue(self.thumbnail_exists(customer.image_hash, 'profile'))
+        self.assertFalse(self.thumbnail_exists(first_hash, 'pdf'))
+
+        response = self.client.get(reverse('customer_list'))
+        self.assertContains(response, thumbnail_name(customer.image_hash, 'avatar'))
+
+        customer.delete()
+        self.assertFalse(self.thumbnail_exists(customer.image_hash, 'pdf'))
+
+
+class ContentAddressedStorageTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('staff'))
+
+    def test_identical_uploads_share_one_reference_counted_file(self):
+        for name in ('Asha', 'Ravi'):
+            self.client.post(reverse('customer_add'), {'first_name': name, 'image': make_image('boy.png')})
+        asha, ravi = Customer.objects.order_by('id')
+        path = asha.image.path
+
+        self.assertEqual(asha.image.name, ravi.image.name)
+        self.assertEqual(MediaBlob.objects.get(name=asha.image.name).refcount, 2)
+
+        self.client.post(reverse('customer_delete', args=[asha.pk]))
+        self.assertTrue(os.path.exists(path))
+        self.client.post(reverse('customer_delete', args=[ravi.pk]))
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_dedupe_media_migrates_legacy_files_and_reclaims_orphans(self):
+        legacy = os.path.join(self.media_root, 'customers')
+        os.makedirs(legacy)
+        content = make_image().read()
+        for name in ('boy.png', 'boy_dERAXYF.png', 'orphan.png'):
+            with open(os.path.join(legacy, name), 'wb') as f:
+                f.write(content)
+        Customer.objects.bulk_create([
+            Customer(first_name='Asha', image='customers/boy.png'),
+            Customer(first_name='Ravi', image='customers/boy_dERAXYF.png'),
+        ])
+
+        call_command('dedupe_media', stdout=StringIO())
+
+        names = set(Customer.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(MediaBlob.objects.get().refcount, 2)
+        files = [f for _, _, fs in os.walk(legacy) for f in fs]
+        self.assertEqual(len(files), 1)
+
+
+class CustomerPdfCacheTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        cache_override = override_settings(CUSTOMER_PDF_CACHE_DIR=self.cache_dir)
+        cache_override.enable()
+        self.addCleanup(cache_override.disable)
+        self.customer = Customer.objects.create(first_name='Asha')
+        self.url = reverse('download_customer_pdf_individual', args=[self.customer.pk])
+        self.client.force_login(User.objects.create_user('staff'))
+
+    def test_repeat_download_is_a_cache_hit_or_304(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(b''.join(first.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_save_invalidates_entry(self):
+        self.client.get(self.url)
+        self.customer.last_name = 'Menon'
+        self.customer.save()
+
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    @override_settings(CUSTOMER_PDF_CACHE_MAX_BYTES=0)
+    def test_entries_beyond_size_cap_are_evicted(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(os.listdir(self.cache_dir), [])
+        # The response still reads the evicted file through its open handle.
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_eviction_skips_entries_removed_by_another_worker(self):
+        for name in ('1-a.pdf', '2-b.pdf'):
+            with open(os.path.join(self.cache_dir, name), 'wb') as f:
+                f.write(b'%PDF')
+
+        def scandir_racing_a_delete(path, scandir=os.scandir):
+            entries = list(scandir(path))
+            os.remove(entries[0].path)
+            return entries
+
+        with mock.patch('customer_app.pdf_cache.os.scandir', scandir_racing_a_delete):
+            evict(max_bytes=0)
+
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+class DuplicateCustomerTests(TestCase):
+    def setUp(self):
+        Customer.objects.bulk_create([
+            Customer(first_name='Asha', last_name='Menon', email='asha@example.com', phone='98765 43210'),
+            Customer(first_name='Asha', last_name='Menon', phone='+91 9876543210', city='Kochi'),
+            Customer(first_name='Ravi', last_name='Kumar', email='RAVI.K@example.com', city='Pune'),
+            Customer(first_name='Ravi', last_name='Kumar', email='ravik@example.com'),
+            Customer(first_name='Ravi', last_name='Kumaar', city='Pune', state='MH'),
+            Customer(first_name='Meera', last_name='Nair', email='meera@example.com', phone='9000000001'),
+        ])
+
+    def test_clusters_variants_of_phone_email_and_name(self):
+        clusters = find_duplicate_clusters()
+
+        names = [(len(c), Customer.objects.get(pk=c[0]).first_name) for c in clusters]
+        self.assertEqual(names, [(3, 'Ravi'), (2, 'Asha')])
+
+    def test_merge_keeps_oldest_and_fills_blank_fields(self):
+        call_command('find_duplicates', '--merge', stdout=StringIO())
+
+        self.assertEqual(Customer.objects.count(), 3)
+        self.assertEqual(CustomerTombstone.objects.count(), 3)
+        asha = Customer.objects.get(first_name='Asha')
+        self.assertEqual((asha.email, asha.phone, asha.city.name), ('asha@example.com', '98765 43210', 'Kochi'))
+        ravi = Customer.objects.get(first_name='Ravi')
+        self.assertEqual((ravi.city.name, ravi.state.name), ('Pune', 'MH'))
+
+    def test_admin_view_merges_selected_clusters(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        url = reverse('admin:customer_app_customer_duplicates')
+        response = self.client.get(url)
+        self.assertContains(response, '2 clusters found')
+
+        asha = ','.join(str(pk) for pk in Customer.objects.filter(first_name='Asha').values_list('pk', flat=True))
+        self.client.post(url, {'cluster': [asha]})
+
+        self.assertEqual(Customer.objects.filter(first_name='Asha').count(), 1)
+        self.assertEqual(Customer.objects.count(), 5)
+
+    def test_admin_view_only_merges_clusters_that_still_match(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        asha = list(Customer.objects.filter(first_name='Asha').values_list('pk', flat=True))
+        forged = [Customer.objects.get(first_name='Meera').pk, Customer.objects.get(city__name='Pune', state=None).pk]
+        Customer.objects.filter(pk=asha[1]).update(first_name='Zoya', last_name='Khan')
+
+        response = self.client.post(reverse('admin:customer_app_customer_duplicates'), {
+            'cluster': [','.join(map(str, asha)), ','.join(map(str, forged))]}, follow=True)
+
+        self.assertEqual(Customer.objects.count(), 6)
+        self.assertContains(response, 'Skipped 2 clusters')
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        self.client.force_login(User.objects.create_user('staff'))
+
+    def test_records_latency_queries_and_size_per_url_name(self):
+        Customer.objects.create(first_name='Asha')
+        response = self.client.get(reverse('customer_list'))
+
+        latency = registry.value('http_request_duration_seconds', ('customer_list',))
+        self.assertEqual(sum(latency.counts), 1)
+        self.assertGreater(registry.value('db_queries_per_request', ('customer_list',)).sum, 0)
+        self.assertEqual(registry.value('http_response_size_bytes', ('customer_list',)).sum,
+                         len(response.content))
+
+        with self.settings(DEBUG=True):
+            body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('http_requests_total{view="customer_list",method="GET",status="200"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="customer_list",le="+Inf"} 1', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_are_hidden_without_a_token_outside_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_log_top_queries(self):
+        with self.assertLogs('customer_app.middleware', 'WARNING') as logs:
+            self.client.get(reverse('customer_list'))
+
+        self.assertIn('customer_list', logs.output[0])
+        self.assertIn('customer_app_customer', logs.output[0])
+
+
+class SeedCustomersTests(TempMediaMixin, TestCase):
+    def test_seeds_customers_sharing_reference_counted_images(self):
+        call_command('seed_customers', '25', '--images', '2', '--batch-size', '10', stdout=StringIO())
+
+        self.assertEqual(Customer.objects.count(), 25)
+        self.assertEqual(Customer.objects.values('email').distinct().count(), 25)
+        self.assertEqual(sorted(MediaBlob.objects.values_list('refcount', flat=True)), [12, 13])
+        self.assertEqual(search_customers(Customer.objects.first().email.split('@')[0])[0].pk,
+                         Customer.objects.first().pk)
+
+    def test_seeding_stores_no_more_images_than_customers(self):
+        call_command('seed_customers', '2', '--images', '5', stdout=StringIO())
+
+        self.assertEqual(sorted(MediaBlob.objects.values_list('refcount', flat=True)), [1, 1])
+        stored = [name for _, _, files in os.walk(self.media_root) for name in files if not name.endswith('.webp')]
+        self.assertEqual(len(stored), 2)
+
+
+PRODUCTION_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000}
+
+
+class SqliteProfileTests(TestCase):
+    """Customer reads against a file database while ``import_customers``
+    writes to it from another thread, as the list page meets an import."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'db.sqlite3')
+        connection.ensure_connection()
+        with closing(sqlite3.connect(path)) as target:
+            connection.connection.backup(target)
+        self.database_settings = {'default': {**connection.settings_dict, 'NAME': path,
+                                              'OPTIONS': {'timeout': 0}}}
+        with self.use_database():
+            Customer.objects.create(first_name='Asha')
+
+    @contextmanager
+    def use_database(self):
+        """Point this thread's default connection at the file database."""
+        previous = connections['default']
+        connections['default'] = ConnectionHandler(self.database_settings)['default']
+        try:
+            yield
+        finally:
+            connections['default'].close()
+            connections['default'] = previous
+
+    def start_import(self, pause_in_batch=False):
+        """Import one batch on another thread; returns (locked, release, finished, errors)."""
+        locked, release, finished = threading.Event(), threading.Event(), threading.Event()
+        errors = []
+        original = importer.apply_geography_deltas
+
+        def hold_write_lock(deltas):
+            # Runs inside the batch transaction, after its INSERT.
+            locked.set()
+            if pause_in_batch:
+                release.wait(10)
+            return original(deltas)
+
+        def run():
+            try:
+                with self.use_database(), mock.patch.object(importer, 'apply_geography_deltas', hold_write_lock):
+                    import_customers(make_workbook(['first_name'], [['Ravi'], ['Meera']]))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                locked.set()
+                finished.set()
+
+        threading.Thread(target=run).start()
+        self.addCleanup(finished.wait, 10)
+        self.addCleanup(release.set)
+        return locked, release, finished, errors
+
+    def names(self):
+        return sorted(Customer.objects.values_list('first_name', flat=True))
+
+    @override_settings(SQLITE_PRAGMAS=PRODUCTION_PRAGMAS)
+    def test_reads_and_writes_keep_going_during_import_in_wal_mode(self):
+        locked, release, finished, errors = self.start_import(pause_in_batch=True)
+        self.assertTrue(locked.wait(10))
+        with self.use_database():
+            # The batch holds the write lock: readers see the last commit.
+            self.assertEqual(self.names(), ['Asha'])
+            # A second writer waits (busy_timeout) instead of failing.
+            threading.Timer(0.2, release.set).start()
+            Customer.objects.create(first_name='John')
+            self.assertTrue(finished.wait(10))
+            self.assertEqual(errors, [])
+            self.assertEqual(self.names(), ['Asha', 'John', 'Meera', 'Ravi'])
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 1)
+
+    @override_settings(SQLITE_PRAGMAS=PRODUCTION_PRAGMAS)
+    def test_import_commits_under_an_open_read_in_wal_mode(self):
+        with self.use_database(), transaction.atomic():
+            self.assertEqual(self.names(), ['Asha'])
+            *_, finished, errors = self.start_import()
+            self.assertTrue(finished.wait(10))
+            self.assertEqual(self.names(), ['Asha'])
+        self.assertEqual(errors, [])
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_rollback_journal_import_fails_under_an_open_read(self):
+        with self.use_database(), transaction.atomic():
+            self.assertEqual(self.names(), ['Asha'])
+            *_, finished, errors = self.start_import()
+            self.assertTrue(finished.wait(10))
+        self.assertIsInstance(errors[0], OperationalError)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.seen = []
+
+        @replica_reads
+        def read_view(request):
+            self.seen.append(router.db_for_read(Customer))
+            return HttpResponse()
+
+        def write_view(request):
+            self.seen.append(router.db_for_read(Customer))
+            return HttpResponse()
+
+        def get_response(request):
+            self.middleware.process_view(request, request.view, (), {})
+            return request.view(request)
+
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+        self.views = {'read': read_view, 'write': write_view}
+
+    def call(self, method, view, cookies=None):
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        request.view = self.views[view]
+        return self.middleware(request)
+
+    def test_marked_reads_go_to_a_replica_and_everything_else_to_primary(self):
+        self.call('get', 'read')
+        self.call('get', 'write')
+        self.call('post', 'read')
+
+        self.assertEqual(self.seen, ['replica1', 'default', 'default'])
+        self.assertEqual(router.db_for_read(Customer), 'default')
+        self.assertEqual(router.db_for_write(Customer), 'default')
+        self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_writes_pin_the_browser_to_the_primary(self):
+        response = self.call('post', 'write')
+        self.call('get', 'read', cookies={PIN_COOKIE: response.cookies[PIN_COOKIE].value})
+
+        self.assertEqual(self.seen[-1], 'default')
+
+    def test_sync_copies_the_primary_into_a_replica(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        primary, replica = os.path.join(directory, 'primary.db'), os.path.join(directory, 'replica.db')
+        with closing(sqlite3.connect(primary)) as db:
+            db.execute('CREATE TABLE customers (name TEXT)')
+            db.execute("INSERT INTO customers VALUES ('Asha')")
+            db.commit()
+
+        copy_sqlite_database(primary, replica)
+
+        with closing(sqlite3.connect(replica)) as db:
+            self.assertEqual(db.execute('SELECT name FROM customers').fetchall(), [('Asha',)])
+
+
+class CustomerExportTests(TestCase):
+    def setUp(self):
+        Customer.objects.create(first_name='Asha', last_name='Menon', city='Kochi')
+        Customer.objects.create(first_name='Ravi', last_name='Kumar', city='Pune')
+        self.client.force_login(User.objects.create_user('staff'))
+
+    def test_csv_streams_filtered_rows(self):
+        response = self.client.get(reverse('download_customers_csv'), {'q': 'koch'})
+
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'ID,First Name,Last Name,Email,Phone,City,State,Country,Created At,Updated At')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Asha,Menon,,,Kochi', lines[1])
+
+    def test_xlsx_contains_every_customer_newest_first(self):
+        response = self.client.get(reverse('download_customers_xlsx'))
+
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.iter_rows(min_row=2, values_only=True))
+        self.assertEqual([row[1] for row in rows], ['Ravi', 'Asha'])
+
+    def test_xlsx_spool_is_closed_when_the_export_fails(self):
+        spools = []
+
+        def temporary_file(make=tempfile.TemporaryFile):
+            spools.append(make())
+            return spools[-1]
+
+        with mock.patch('customer_app.views.tempfile.TemporaryFile', temporary_file), \
+                mock.patch('customer_app.views.write_xlsx', side_effect=ValueError('broken')):
+            response = self.client.get(reverse('download_customers_xlsx'))
+
+        self.assertEqual(response.status_code, 500)
+        self.assertTrue(spools[0].closed)
+
+
+@override_settings(CUSTOMER_CHANGES_LAG_SECONDS=0)
+class CustomerChangesTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('staff'))
+        self.url = reverse('customer_changes')
+
+    def test_feed_pages_changes_and_deletions_from_cursor(self):
+        asha = Customer.objects.create(first_name='Asha')
+        ravi = Customer.objects.create(first_name='Ravi')
+        first = self.client.get(self.url, {'limit': 1}).json()
+        self.assertEqual([c['first_name'] for c in first['changed']], ['Asha'])
+        self.assertTrue(first['has_more'])
+        second = self.client.get(self.url, {'cursor': first['cursor']}).json()
+        self.assertEqual([c['first_name'] for c in second['changed']], ['Ravi'])
+
+        asha.city = 'Kochi'
+        asha.save()
+        self.client.post(reverse('customer_delete', args=[ravi.pk]))
+        third = self.client.get(self.url, {'cursor': second['cursor']}).json()
+
+        self.assertEqual([c['city'] for c in third['changed']], ['Kochi'])
+        self.assertEqual([d['id'] for d in third['deleted']], [ravi.pk])
+        self.assertFalse(third['has_more'])
+        empty = self.client.get(self.url, {'cursor': third['cursor']}).json()
+        self.assertEqual((empty['changed'], empty['deleted']), ([], []))
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'nope'}).status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(first_name='Asha')
+        self.client.force_login(User.objects.create_user('staff'))
+
+    def revalidate(self, url):
+        self.client.get(url)  # sets the CSRF cookie the page's ETag depends on
+        first = self.client.get(url)
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+        return first, lambda: self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+    def test_unchanged_pages_return_304(self):
+        for url in (reverse('customer_list'), reverse('customer_detail', args=[self.customer.pk]),
+                    reverse('user_list')):
+            with self.subTest(url=url):
+                _, again = self.revalidate(url)
+                response = again()
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+    def test_edits_and_deletes_change_the_list_etag(self):
+        _, again = self.revalidate(reverse('customer_list'))
+        other = Customer.objects.create(first_name='Ravi')
+        self.assertEqual(again().status_code, 200)
+
+        _, again = self.revalidate(reverse('customer_list'))
+        other.delete()
+        self.assertEqual(again().status_code, 200)
+
+    def test_user_edits_change_the_user_list_etag_but_logins_do_not(self):
+        other = User.objects.create_user('ravi')
+        _, again = self.revalidate(reverse('user_list'))
+        other.email = 'ravi@example.com'
+        other.save()
+        self.assertContains(again(), 'ravi@example.com')
+
+        _, again = self.revalidate(reverse('user_list'))
+        other.last_login = timezone.now()
+        other.save(update_fields=['last_login'])
+        self.assertEqual(again().status_code, 304)
+        other.delete()
+        self.assertEqual(again().status_code, 200)
+
+    def test_detail_changes_when_customer_is_saved(self):
+        _, again = self.revalidate(reverse('customer_detail', args=[self.customer.pk]))
+        self.customer.city = 'Kochi'
+        self.customer.save()
+        self.assertContains(again(), 'Kochi')
+
+    def test_other_users_do_not_get_304(self):
+        first = self.client.get(reverse('customer_list'))
+        self.client.force_login(User.objects.create_user('other'))
+        response = self.client.get(reverse('customer_list'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+
+class CustomerRowCacheTests(TestCase):
+    def setUp(self):
+        caches['template_fragments'].clear()
+        self.customer = Customer.objects.create(first_name='Asha')
+        self.client.force_login(User.objects.create_user('staff'))
+
+    def test_rows_are_cached_until_the_customer_changes(self):
+        self.client.get(reverse('customer_list'))
+        Customer.objects.filter(pk=self.customer.pk).update(first_name='Stale')
+        self.assertContains(self.client.get(reverse('customer_list')), 'Asha')
+
+        self.customer.first_name = 'Ravi'
+        self.customer.save()
+        self.assertContains(self.client.get(reverse('customer_list')), 'Ravi')
+
+    def test_delete_buttons_share_one_csrf_form(self):
+        response = self.client.get(reverse('customer_list'))
+
+        self.assertContains(response, 'csrfmiddlewaretoken', count=3)  # bulk upload, delete and bulk action forms
+        self.assertContains(response, f'formaction="{reverse("customer_delete", args=[self.customer.pk])}"')
+
+
+class ImagePipelineTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('staff'))
+
+    def test_uploads_are_resized_stripped_and_get_a_webp_copy(self):
+        photo = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        Image.new('RGB', (4000, 3000), 'blue').save(photo, format='JPEG', exif=exif)
+        upload = SimpleUploadedFile('photo.jpg', photo.getvalue(), content_type='image/jpeg')
+
+        self.client.post(reverse('customer_add'), {'first_name': 'Asha', 'image': upload})
+
+        customer = Customer.objects.get()
+        with Image.open(customer.image.path) as stored:
+            self.assertEqual(stored.size, (1600, 1200))
+            self.assertEqual(len(stored.getexif()), 0)
+        self.assertTrue(customer.image.storage.exists(webp_variant_name(customer.image.name)))
+
+    def test_webp_copy_is_encoded_from_the_upload_not_the_stored_jpeg(self):
+        photo = BytesIO()
+        Image.effect_noise((800, 600), 64).convert('RGB').save(photo, format='PNG')
+
+        self.client.post(reverse('customer_add'), {'first_name': 'Asha', 'image': SimpleUploadedFile(
+            'photo.png', photo.getvalue(), content_type='image/png')})
+
+        customer = Customer.objects.get()
+        _, _, expected = optimize_image_bytes(photo.getvalue(), settings.CUSTOMER_IMAGE_MAX_SIZE,
+                                              settings.CUSTOMER_IMAGE_QUALITY, settings.CUSTOMER_IMAGE_WEBP_QUALITY)
+        with customer.image.storage.open(webp_variant_name(customer.image.name)) as webp:
+            self.assertEqual(webp.read(), expected)
+
+    def test_backfill_optimizes_existing_files(self):
+        customer = Customer.objects.create(first_name='Asha', image=SimpleUploadedFile(
+            'big.png', make_image(size=(3000, 2000)).read()))
+        old_name = customer.image.name
+
+        call_command('optimize_images', '--workers', '1', stdout=StringIO())
+
+        customer.refresh_from_db()
+        self.assertTrue(customer.image.name.endswith('.jpg'))
+        self.assertFalse(customer.image.storage.exists(old_name))
+        self.assertEqual(MediaBlob.objects.get().name, customer.image.name)
+        with Image.open(customer.image.path) as stored:
+            self.assertEqual(max(stored.size), 1600)
+
+    def test_backfill_strips_metadata_from_small_images(self):
+        tagged = BytesIO()
+        text = PngImagePlugin.PngInfo()
+        text.add_text('Software', 'www.inkscape.org')
+        Image.new('RGBA', (512, 512), 'red').save(tagged, format='PNG', pnginfo=text, dpi=(222, 222))
+        customer = Customer.objects.create(first_name='Asha', image=SimpleUploadedFile('icon.png', tagged.getvalue()))
+
+        out = StringIO()
+        call_command('optimize_images', '--workers', '1', stdout=out)
+
+        customer.refresh_from_db()
+        self.assertIn('Optimized 1 of 1', out.getvalue())
+        with Image.open(customer.image.path) as stored:
+            self.assertEqual(stored.info, {})
+
+        call_command('optimize_images', '--workers', '1', stdout=out)
+        self.assertIn('Optimized 0 of 1', out.getvalue())
+
+
+@override_settings(ROOT_URLCONF='Customer.asgi_urls', CUSTOMER_IMPORT_ASYNC=False)
+class AsyncViewTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        caches['template_fragments'].clear()
+        self.customer = Customer.objects.create(first_name='Asha', last_name='Menon', city='Kochi')
+        self.user = User.objects.create_user('staff')
+        self.async_client.force_login(self.user)
+
+    async def test_list_detail_and_search(self):
+        response = await self.async_client.get(reverse('customer_list'))
+        self.assertContains(response, 'Asha')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        response = await self.async_client.get(reverse('customer_detail', args=[self.customer.pk]))
+        self.assertContains(response, 'Kochi')
+        again = await self.async_client.get(reverse('customer_detail', args=[self.customer.pk]),
+                                            headers={'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+        response = await self.async_client.get(reverse('customer_search'), {'q': 'Menon'})
+        self.assertEqual([r['id'] for r in response.json()['results']], [self.customer.pk])
+
+        response = await self.async_client.get(reverse('customer_detail', args=[self.customer.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_upload_queues_import(self):
+        excel = make_workbook(['first_name', 'email'], [['Ravi', 'ravi@example.com']])
+        response = await self.async_client.post(
+            reverse('customer_bulk_upload'), {'excel_file': SimpleUploadedFile('customers.xlsx', excel.read())})
+
+        self.assertRedirects(response, reverse('customer_list'), fetch_redirect_response=False)
+        job = await ImportJob.objects.aget()
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertTrue(await Customer.objects.filter(first_name='Ravi').aexists())
+
+    async def test_import_job_status_is_scoped_to_its_creator(self):
+        own = await ImportJob.objects.acreate(created_by=self.user)
+        other = await ImportJob.objects.acreate(created_by=await User.objects.acreate(username='other'))
+
+        response = await self.async_client.get(reverse('import_job_status', args=[own.pk]))
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get(reverse('import_job_status', args=[other.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_anonymous_requests_are_redirected_to_login(self):
+        response = await AsyncClient().get(reverse('customer_list'))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(reverse('login')))
+
+
+class GeographySummaryTests(TestCase):
+    def summary(self):
+        rows = GeographySummary.objects.select_related('country', 'state', 'city')
+        return {(str(row.country or ''), str(row.state or ''), str(row.city or '')): row.customers for row in rows}
+
+    def assertMatchesRebuild(self):
+        maintained = self.summary()
+        rebuild_geography_summary()
+        self.assertEqual(maintained, self.summary())
+
+    def test_saves_and_deletes_update_the_summary(self):
+        asha = Customer.objects.create(first_name='Asha', city='Kochi', state='Kerala', country='India')
+        ravi = Customer.objects.create(first_name='Ravi', city='Kochi', state='Kerala', country='India')
+        self.assertEqual(self.summary(), {('India', 'Kerala', 'Kochi'): 2})
+
+        ravi.city = 'Thrissur'
+        ravi.save()
+        asha.first_name = 'Asha M'
+        asha.save()
+        self.assertEqual(self.summary(), {('India', 'Kerala', 'Kochi'): 1, ('India', 'Kerala', 'Thrissur'): 1})
+
+        asha.delete()
+        self.assertEqual(self.summary(), {('India', 'Kerala', 'Thrissur'): 1})
+        self.assertMatchesRebuild()
+
+    def test_imports_apply_batched_deltas(self):
+        Customer.objects.create(first_name='Asha', email='asha@example.com', city='Kochi', country='India')
+        excel = make_workbook(
+            ['first_name', 'email', 'city', 'country'],
+            [['Asha', 'asha@example.com', 'Pune', 'India']] +
+            [[f'Name{i}', f'user{i}@example.com', 'Chennai', 'India'] for i in range(30)],
+        )
+        with CaptureQueriesContext(connection) as queries:
+            import_customers(excel, batch_size=100, mode='upsert')
+
+        summary_queries = [q for q in queries if 'geographysummary' in q['sql']]
+        self.assertEqual(len(summary_queries), 6)  # 3 updates, 2 inserts, 1 cleanup
+        self.assertEqual(self.summary(), {('India', '', 'Chennai'): 30, ('India', '', 'Pune'): 1})
+        self.assertMatchesRebuild()
+
+    def test_merging_duplicates_keeps_the_summary_consistent(self):
+        Customer.objects.create(first_name='Asha', last_name='Menon', email='asha@example.com')
+        Customer.objects.create(first_name='Asha', last_name='Menon', email='asha@example.com',
+                                city='Kochi', country='India')
+        merge_clusters(find_duplicate_clusters())
+
+        self.assertEqual(self.summary(), {('India', '', 'Kochi'): 1})
+        self.assertMatchesRebuild()
+
+    def test_dashboard_drills_down_from_country_to_city(self):
+        self.client.force_login(User.objects.create_user('staff'))
+        for city, state in [('Kochi', 'Kerala'), ('Kochi', 'Kerala'), ('Chennai', 'Tamil Nadu')]:
+            Customer.objects.create(first_name='Asha', city=city, state=state, country='India')
+        Customer.objects.create(first_name='John', country='United Kingdom')
+
+        response = self.client.get(reverse('customer_geography'))
+        self.assertEqual([(r['name'], r['customers']) for r in response.context['rows']],
+                         [('India', 3), ('United Kingdom', 1)])
+        india, kerala = Country.objects.get(name='India'), State.objects.get(name='Kerala')
+        response = self.client.get(reverse('customer_geography'), {'country': india.pk, 'state': kerala.pk})
+        self.assertEqual(response.context['rows'],
+                         [{'id': City.objects.get(name='Kochi').pk, 'name': 'Kochi', 'customers': 2}])
+        response = self.client.get(reverse('customer_geography'), {'country': india.pk, 'state': ''})
+        self.assertEqual(response.context['rows'], [])
+        self.assertEqual(self.client.get(reverse('customer_geography'), {'country': 'x'}).status_code, 400)
+
+
+@override_settings(CUSTOMER_BULK_CHUNK_SIZE=2)
+class BulkActionTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        pdf_cache = override_settings(CUSTOMER_PDF_CACHE_DIR=os.path.join(self.media_root, 'pdf-cache'))
+        pdf_cache.enable()
+        self.addCleanup(pdf_cache.disable)
+        self.client.force_login(User.objects.create_user('staff'))
+
+    def add(self, name, **fields):
+        self.client.post(reverse('customer_add'), {'first_name': name, **fields})
+        return Customer.objects.get(first_name=name)
+
+    def test_delete_removes_customers_in_chunks_and_releases_images(self):
+        asha = self.add('Asha', city='Kochi', country='India', image=make_image('boy.png'))
+        ravi = self.add('Ravi', city='Kochi', country='India', image=make_image('boy.png'))
+        meera = self.add('Meera', city='Pune', country='India', image=make_image(color='blue'))
+        john = self.add('John', country='United Kingdom', image=make_image('boy.png'))
+        shared_path = asha.image.path
+
+        deleted_signals = []
+
+        def receiver(instance, **kwargs):
+            deleted_signals.append(instance)
+        post_delete.connect(receiver, sender=Customer)
+        self.addCleanup(post_delete.disconnect, receiver, sender=Customer)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('customer_bulk_action'),
+                                        {'action': 'delete', 'ids': [asha.pk, ravi.pk, meera.pk]})
+        self.assertRedirects(response, reverse('customer_list'), fetch_redirect_response=False)
+
+        # One DELETE per chunk and no post_delete signals: what the private
+        # QuerySet._raw_delete used by bulk_delete_customers is relied on for.
+        deletes = [q for q in queries if q['sql'].startswith('DELETE FROM "customer_app_customer"')]
+        self.assertEqual(len(deletes), 2)
+        self.assertEqual(deleted_signals, [])
+        self.assertEqual(list(Customer.objects.all()), [john])
+        self.assertEqual(sorted(CustomerTombstone.objects.values_list('customer_id', flat=True)),
+                         [asha.pk, ravi.pk, meera.pk])
+        self.assertEqual(MediaBlob.objects.get(name=john.image.name).refcount, 1)
+        self.assertTrue(os.path.exists(shared_path))
+        self.assertFalse(os.path.exists(meera.image.path))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, thumbnail_name(meera.image_hash, 'pdf'))))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, thumbnail_name(john.image_hash, 'pdf'))))
+        self.assertEqual(search_customers('asha'), [])
+        maintained = set(GeographySummary.objects.values_list('country_id', 'state_id', 'city_id', 'customers'))
+        rebuild_geography_summary()
+        self.assertEqual(maintained, {(john.country_id, None, None, 1)})
+
+    def test_failed_delete_keeps_customers_and_their_files(self):
+        asha = self.add('Asha', image=make_image())
+        thumbnail = os.path.join(self.media_root, thumbnail_name(asha.image_hash, 'pdf'))
+
+        with mock.patch('customer_app.bulk.apply_geography_deltas', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError), self.captureOnCommitCallbacks(execute=True):
+                bulk_delete_customers([asha.pk])
+
+        self.assertEqual(list(Customer.objects.all()), [asha])
+        self.assertTrue(os.path.exists(asha.image.path))
+        self.assertTrue(os.path.exists(thumbnail))
+
+    def test_all_matching_needs_a_search(self):
+        self.add('Asha')
+        self.add('Ravi')
+
+        response = self.client.post(reverse('customer_bulk_action'), {'action': 'delete', 'all_matching': '1'})
+
+        self.assertRedirects(response, reverse('customer_list'), fetch_redirect_response=False)
+        self.assertEqual(Customer.objects.count(), 2)
+
+    def test_update_sets_a_location_on_every_matching_customer(self):
+        for name in ('Asha', 'Ravi', 'Meera'):
+            self.add(name, last_name='Menon', city='Kochi', country='Inida')
+        self.add('John', last_name='Smith', country='Inida')
+        before = Customer.objects.get(first_name='Asha').updated_at
+
+        url = reverse('customer_bulk_action') + '?q=menon'
+        response = self.client.post(url, {'action': 'update', 'field': 'country', 'value': 'India',
+                                          'all_matching': '1'})
+        self.assertRedirects(response, reverse('customer_list') + '?q=menon', fetch_redirect_response=False)
+
+        countries = dict(Customer.objects.values_list('first_name', 'country__name'))
+        self.assertEqual(countries, {'Asha': 'India', 'Ravi': 'India', 'Meera': 'India', 'John': 'Inida'})
+        self.assertGreater(Customer.objects.get(first_name='Asha').updated_at, before)
+        self.assertEqual(len(search_customers('india menon')), 3)
+        maintained = set(GeographySummary.objects.values_list('country__name', 'city__name', 'customers'))
+        self.assertEqual(maintained, {('India', 'Kochi', 3), ('Inida', None, 1)})
+        rebuild_geography_summary()
+        self.assertEqual(maintained, set(GeographySummary.objects.values_list('country__name', 'city__name',
+                                                                              'customers')))
+
+        self.client.post(reverse('customer_bulk_action'), {'action': 'update', 'field': 'city', 'value': '',
+                                                           'ids': [Customer.objects.get(first_name='Asha').pk]})
+        self.assertIsNone(Customer.objects.get(first_name='Asha').city)
+
+    def test_pdf_contains_only_the_selected_customers(self):
+        asha, ravi = self.add('Asha'), self.add('Ravi')
+        self.add('Meera')
+
+        response = self.client.post(reverse('customer_bulk_action'), {'action': 'pdf', 'ids': [asha.pk, ravi.pk]})
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_update_needs_a_field_and_get_is_refused(self):
+        asha = self.add('Asha', city='Kochi')
+
+        self.client.post(reverse('customer_bulk_action'), {'action': 'update', 'ids': [asha.pk]})
+        self.assertEqual(Customer.objects.get().city.name, 'Kochi')
+        self.assertEqual(self.client.get(reverse('customer_bulk_action')).status_code, 405)
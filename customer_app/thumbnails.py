@@ -0,0 +1,92 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from PIL import Image
+
+THUMBNAIL_DIR = 'thumbs'
+
+
+def content_hash(file):
+    """Return the SHA-256 hex digest of a Django ``File``, leaving it rewound."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def thumbnail_name(image_hash, size_name):
+    size = settings.CUSTOMER_THUMBNAIL_SIZES[size_name]
+    return f'{THUMBNAIL_DIR}/{image_hash[:2]}/{image_hash}_{size}.png'
+
+
+def _thumbnail_file(image_hash, size_name):
+    return os.path.join(settings.MEDIA_ROOT, thumbnail_name(image_hash, size_name))
+
+
+def _write_thumbnail(source, size, path):
+    thumb = source.copy()
+    thumb.thumbnail((size, size))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.png', dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as out:
+        thumb.save(out, format='PNG', optimize=True)
+    os.replace(tmp_path, path)
+
+
+def ensure_thumbnails(image, image_hash, size_names=None):
+    """Create any missing thumbnails of ``image`` and return their paths.
+
+    Thumbnails are keyed by content hash, so a changed image never reuses a
+    stale thumbnail and identical images share one set. The source image is
+    decoded at most once per call.
+    """
+    size_names = size_names or list(settings.CUSTOMER_THUMBNAIL_SIZES)
+    paths = {name: _thumbnail_file(image_hash, name) for name in size_names}
+    missing = [name for name, path in paths.items() if not os.path.exists(path)]
+    if missing:
+        with image.open('rb') as f, Image.open(f) as source:
+            source.load()
+            if source.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                source = source.convert('RGBA')
+            for name in missing:
+                _write_thumbnail(source, settings.CUSTOMER_THUMBNAIL_SIZES[name], paths[name])
+    return paths
+
+
+def thumbnail_path(image, image_hash, size_name):
+    """Return the filesystem path of a thumbnail, or of the original image.
+
+    Falls back to the original file when the image has no hash yet or cannot
+    be decoded, and returns ``None`` when there is no image at all.
+    """
+    if not image:
+        return None
+    if image_hash:
+        try:
+            return ensure_thumbnails(image, image_hash, [size_name])[size_name]
+        except (OSError, ValueError):
+            pass
+    return image.path
+
+
+def thumbnail_url(image, image_hash, size_name):
+    if not image:
+        return ''
+    if image_hash:
+        try:
+            ensure_thumbnails(image, image_hash, [size_name])
+            return settings.MEDIA_URL + thumbnail_name(image_hash, size_name)
+        except (OSError, ValueError):
+            pass
+    return image.url
+
+
+def delete_thumbnails(image_hash):
+    for size_name in settings.CUSTOMER_THUMBNAIL_SIZES:
+        try:
+            os.remove(_thumbnail_file(image_hash, size_name))
+        except FileNotFoundError:
+            pass
@@ -4,14 +4,21 @@ from django.urls import path
 urlpatterns = [
     path('', views.home_view, name='home'),   
     path('customers/', views.customer_list, name='customer_list'),
+    path('customers/search/', views.customer_search, name='customer_search'),
+    path('customers/changes/', views.customer_changes_feed, name='customer_changes'),
+    path('customers/geography/', views.customer_geography, name='customer_geography'),
     path('customers/add/', views.customer_create, name='customer_add'),
     path('customers/<int:pk>/edit/', views.customer_edit, name='customer_edit'),
     path('customers/<int:pk>/delete/', views.customer_delete, name='customer_delete'),
+    path('customers/bulk/', views.customer_bulk_action, name='customer_bulk_action'),
     
     path('customers/<int:pk>/', views.customer_detail, name='customer_detail'),
     
     path('customers/bulk-upload/', views.customer_bulk_upload, name='customer_bulk_upload'),
+    path('customers/import-jobs/<int:pk>/', views.import_job_status, name='import_job_status'),
     path('customers/download/pdf/', views.download_customers_pdf, name='download_customers_pdf'),
+    path('customers/download/csv/', views.download_customers_csv, name='download_customers_csv'),
+    path('customers/download/xlsx/', views.download_customers_xlsx, name='download_customers_xlsx'),
     path("customers/<int:pk>/download/", views.download_customer_pdf_individual, name="download_customer_pdf_individual"),
 
     path('users/', views.user_list, name='user_list'),
@@ -21,6 +28,8 @@ urlpatterns = [
     path('users/<int:pk>/delete/', views.user_delete, name='user_delete'),
     path('users/<int:pk>/', views.user_detail, name='user_detail'),
 
+    path('metrics', views.metrics, name='metrics'),
+
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
 ]
\ No newline at end of file
@@ -1,17 +1,37 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import urlencode
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import HttpResponse, Http404
-from .models import Customer
-from .forms import CustomerForm, ExcelUploadForm, UserForm
-import pandas as pd
-from reportlab.lib.pagesizes import letter
-from io import BytesIO
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
+from django.http import FileResponse, HttpResponse, Http404, JsonResponse, StreamingHttpResponse
+from .models import Country, Customer, ImportJob, State, UserListVersion
+from .bulk import bulk_delete_customers, bulk_update_customers
+from .changes import customer_changes, record_deletions
+from .forms import CustomerBulkActionForm, CustomerForm, ExcelUploadForm, UserForm
+from .geography import UNSET, geography_breakdown
+from .exports import csv_chunks, export_rows, write_xlsx
+from .jobs import enqueue_import
+from .locations import LOCATION_FIELDS
+from .metrics import registry
+from .pagination import KeysetPage, keyset_paginate
+from .routers import replica_reads
+from .search import search_customers, search_queryset
+from .pdf import (
+    build_customers_report, build_customers_report_parallel, customer_records, parallel_available, report_queryset,
+)
+from .pdf_cache import cached_profile_pdf, profile_version
+from contextlib import contextmanager
+import hashlib
+import tempfile
 
 
 def home_view(request):
@@ -53,15 +73,112 @@ def logout_view(request):
 
 # --- Customer CRUD ---
 
+def _page_etag(request, *parts):
+    """ETag for a page rendered for ``request.user`` from ``parts``.
+
+    Returns None while flash messages are pending, so they are rendered
+    rather than hidden behind a 304. The CSRF cookie is part of the tag
+    because the page embeds a token derived from it.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    user = request.user
+    key = '|'.join(str(part) for part in (
+        user.pk, user.get_username(), user.get_full_name(),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''), *parts,
+    ))
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def customer_list_etag(request):
+    customers = Customer.objects.aggregate(last=Max('updated_at'), count=Count('id'))
+    jobs = ImportJob.objects.filter(created_by=request.user).aggregate(last=Max('updated_at'))
+    return _page_etag(request, request.get_full_path(), customers['last'], customers['count'], jobs['last'])
+
+
+def customer_detail_etag(request, pk):
+    updated_at = customer_updated_at(request, pk)
+    return _page_etag(request, request.path, profile_version(pk, updated_at)) if updated_at else None
+
+
+def _user_list_etag(request):
+    return _page_etag(request, UserListVersion.current())
+
+
+def list_page_size(request):
+    try:
+        page_size = int(request.GET.get('page_size', settings.CUSTOMER_LIST_PAGE_SIZE))
+    except ValueError:
+        page_size = settings.CUSTOMER_LIST_PAGE_SIZE
+    return max(1, min(page_size, settings.CUSTOMER_LIST_MAX_PAGE_SIZE))
+
+
+def customer_list_context(page, import_jobs, **extra):
+    return {
+        'customers': page.items,
+        'page': page,
+        'import_jobs': import_jobs,
+        'row_cache_timeout': settings.CUSTOMER_ROW_CACHE_SECONDS,
+        **extra,
+    }
+
+
+def customer_page(request):
+    page_size = list_page_size(request)
+    query = request.GET.get('q', '').strip()
+    if query:
+        return KeysetPage(items=search_customers(query, limit=page_size), page_size=page_size)
+    try:
+        return keyset_paginate(Customer.objects.all(), page_size,
+                               after=request.GET.get('after'), before=request.GET.get('before'))
+    except ValueError:
+        return keyset_paginate(Customer.objects.all(), page_size)
+
+
 @login_required
+@replica_reads
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=customer_list_etag)
 def customer_list(request):
     try:
-        customers = Customer.objects.all().order_by('-created_at')
-        return render(request, 'customer_list.html', {'customers': customers})
+        page = customer_page(request)
+        return render(request, 'customer_list.html',
+                      customer_list_context(page, recent_import_jobs(request.user)))
     except Exception as e:
         return render(request, 'customer_list.html', {'customers': [], 'error': f"Error: {e}"})
 
 
+@login_required
+@replica_reads
+def customer_search(request):
+    try:
+        customers = search_customers(request.GET.get('q', ''), limit=search_limit(request))
+        return JsonResponse({'results': [search_result(c) for c in customers]})
+    except Exception as e:
+        return JsonResponse({'error': f"Error searching customers: {e}"}, status=500)
+
+
+def search_limit(request):
+    try:
+        limit = int(request.GET.get('limit', 20))
+    except ValueError:
+        limit = 20
+    return max(1, min(limit, settings.CUSTOMER_LIST_MAX_PAGE_SIZE))
+
+
+def search_result(customer):
+    return {
+        'id': customer.pk,
+        'name': str(customer),
+        'email': customer.email,
+        'phone': customer.phone,
+        'city': str(customer.city or ''),
+        'state': str(customer.state or ''),
+        'country': str(customer.country or ''),
+        'url': reverse('customer_detail', args=[customer.pk]),
+    }
+
+
 @login_required
 def customer_create(request):
     try:
@@ -98,7 +215,9 @@ def customer_delete(request, pk):
     try:
         customer = get_object_or_404(Customer, pk=pk)
         if request.method == 'POST':
-            customer.delete()
+            with transaction.atomic():
+                record_deletions([customer.pk])
+                customer.delete()
             return redirect('customer_list')
         return render(request, 'customer_detail.html', {'customer': customer, 'confirm_delete': True})
     except Exception as e:
@@ -106,14 +225,80 @@ def customer_delete(request, pk):
 
 
 @login_required
+@require_POST
+def customer_bulk_action(request):
+    """Delete, update or download the customers ticked on the list, or every
+    customer matching the list's search when ``all_matching`` is set."""
+    try:
+        query = request.GET.get('q', '').strip()
+        list_url = reverse('customer_list') + (f'?{urlencode({"q": query})}' if query else '')
+        form = CustomerBulkActionForm(request.POST, query=query)
+        if not form.is_valid():
+            messages.error(request, ' '.join(form.errors.get('__all__', ['Invalid bulk action.'])))
+            return redirect(list_url)
+        if form.cleaned_data['all_matching']:
+            customers = customer_queryset(request)
+        else:
+            customers = Customer.objects.filter(pk__in=[int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()])
+
+        action = form.cleaned_data['action']
+        if action == 'pdf':
+            return customers_pdf_response(spool_customers_pdf(customers))
+        ids = customers.values_list('pk', flat=True)
+        if action == 'delete':
+            deleted = bulk_delete_customers(ids)
+            messages.success(request, f'Deleted {deleted} customers.')
+        else:
+            field, value = form.cleaned_data['field'], form.cleaned_data['value']
+            updated = bulk_update_customers(ids, field, value)
+            messages.success(request, f'Set {field} to "{value}" on {updated} customers.' if value
+                             else f'Cleared {field} on {updated} customers.')
+        return redirect(list_url)
+    except Exception as e:
+        return HttpResponse(f"Error applying bulk action: {e}", status=500)
+
+
+@login_required
+@replica_reads
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=customer_detail_etag)
 def customer_detail(request, pk):
     try:
-        customer = get_object_or_404(Customer, pk=pk)
+        customer = get_object_or_404(Customer.objects.select_related(*LOCATION_FIELDS), pk=pk)
         return render(request, 'customer_detail.html', {'customer': customer})
     except Exception as e:
         raise Http404(f"Error loading customer: {e}")
 
 
+def location_param(request, name):
+    """Dashboard filter ``name`` as a location id: UNSET when absent, None when blank."""
+    value = request.GET.get(name)
+    if value is None:
+        return UNSET
+    return int(value) if value else None
+
+
+@login_required
+def customer_geography(request):
+    try:
+        country = location_param(request, 'country')
+        state = location_param(request, 'state') if country is not UNSET else UNSET
+    except ValueError:
+        return HttpResponse("Invalid location", status=400)
+    try:
+        rows = geography_breakdown(country, state)
+        return render(request, 'customer_geography.html', {
+            'country': None if country is UNSET else Country.objects.filter(pk=country).first() or '',
+            'country_id': country,
+            'state': None if state is UNSET else State.objects.filter(pk=state).first() or '',
+            'level': 'city' if state is not UNSET else 'state' if country is not UNSET else 'country',
+            'rows': rows,
+            'total': sum(row['customers'] for row in rows),
+        })
+    except Exception as e:
+        return HttpResponse(f"Error loading customer geography: {e}", status=500)
+
+
 # --- Bulk upload from Excel ---
 @login_required
 def customer_bulk_upload(request):
@@ -122,143 +307,186 @@ def customer_bulk_upload(request):
         if request.method == 'POST':
             form = ExcelUploadForm(request.POST, request.FILES)
             if form.is_valid():
-                excel = request.FILES['excel_file']
-                try:
-                    df = pd.read_excel(excel)
-                    for _, row in df.fillna('').iterrows():
-                        Customer.objects.create(
-                            first_name=row.get('first_name') or row.get('First Name') or '',
-                            last_name=row.get('last_name') or row.get('Last Name') or '',
-                            email=row.get('email') or '',
-                            phone=str(row.get('phone') or ''),
-                            city=row.get('city') or '',
-                            state=row.get('state') or '',
-                            country=row.get('country') or '',
-                        )
-                    message = 'Customers imported successfully.'
-                except Exception as e:
-                    message = f'Error processing file: {e}'
+                job = ImportJob.objects.create(file=request.FILES['excel_file'], mode=form.cleaned_data['mode'] or ImportJob.MODE_INSERT,
+                                               created_by=request.user)
+                enqueue_import(job)
+                messages.info(request, f'Import #{job.pk} queued. Progress is shown below.')
+                return redirect('customer_list')
         else:
             form = ExcelUploadForm()
-        return render(request, 'customer_list.html', {
-            'bulk_form': form,
-            'message': message,
-            'customers': Customer.objects.all().order_by('-created_at')
-        })
+        page = customer_page(request)
+        return render(request, 'customer_list.html', customer_list_context(
+            page, recent_import_jobs(request.user), bulk_form=form, message=message))
     except Exception as e:
         return HttpResponse(f"Error bulk uploading customers: {e}", status=500)
 
 
+def recent_import_jobs(user):
+    return ImportJob.objects.filter(created_by=user).order_by('-created_at')[:5]
+
+
+def visible_import_jobs(user):
+    """Import jobs ``user`` may inspect: their own, or any for staff."""
+    jobs = ImportJob.objects.all()
+    return jobs if user.is_staff else jobs.filter(created_by=user)
+
+
+@login_required
+@replica_reads
+def customer_changes_feed(request):
+    try:
+        page = customer_changes(request.GET.get('cursor'), changes_page_size(request))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': f"Error reading customer changes: {e}"}, status=500)
+    return changes_response(page)
+
+
+def changes_page_size(request):
+    try:
+        limit = int(request.GET.get('limit', settings.CUSTOMER_CHANGES_PAGE_SIZE))
+    except ValueError:
+        limit = settings.CUSTOMER_CHANGES_PAGE_SIZE
+    return max(1, min(limit, settings.CUSTOMER_CHANGES_MAX_PAGE_SIZE))
+
+
+def changes_response(page):
+    return JsonResponse({
+        'changed': page.changed,
+        'deleted': page.deleted,
+        'cursor': page.cursor,
+        'has_more': page.has_more,
+    })
+
+
+@login_required
+def import_job_status(request, pk):
+    job = get_object_or_404(visible_import_jobs(request.user), pk=pk)
+    return JsonResponse(job.as_dict())
+
+
 @login_required
+@replica_reads
 def download_customers_pdf(request):
     try:
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter,
-                                rightMargin=40, leftMargin=40, topMargin=60, bottomMargin=40)
-
-        styles = getSampleStyleSheet()
-        story = [Paragraph("<b>Customers Report</b>", styles["Title"]), Spacer(1, 20)]
-
-        customers = Customer.objects.all().order_by("first_name")
-        for c in customers:
-            if c.image:
-                try:
-                    img = Image(c.image.path, width=80, height=80)
-                except Exception:
-                    img = Paragraph("No Image", styles["Normal"])
-            else:
-                img = Paragraph("No Image", styles["Normal"])
-
-            details = [
-                ["Name:", f"{c.first_name} {c.last_name}"],
-                ["Email:", c.email or "—"],
-                ["Phone:", c.phone or "—"],
-                ["Address:", f"{c.city or ''}, {c.state or ''}, {c.country or ''}"],
-            ]
-            table = Table(details, colWidths=[80, 350])
-            table.setStyle(TableStyle([
-                ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
-                ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
-                ("TEXTCOLOR", (0, 0), (0, -1), colors.darkblue),
-            ]))
-
-            profile_row = Table([[img, table]], colWidths=[90, 400])
-            profile_row.setStyle(TableStyle([
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
-            ]))
-
-            story.append(profile_row)
-            story.append(Spacer(1, 20))
-
-        doc.build(story)
-        pdf = buffer.getvalue()
-        buffer.close()
-        response = HttpResponse(content_type="application/pdf")
-        response["Content-Disposition"] = 'attachment; filename="customers.pdf"'
-        response.write(pdf)
-        return response
+        return customers_pdf_response(spool_customers_pdf())
     except Exception as e:
         return HttpResponse(f"Error generating customers PDF: {e}", status=500)
 
 
+def spool_customers_pdf(customers=None):
+    # Spool to disk and stream the file back so the finished report is not
+    # held in memory while it is sent.
+    if customers is None:
+        customers = Customer.objects.all()
+    customers = report_queryset(customers)
+    with spool_file() as spool:
+        # The parallel merge needs more memory per page than the serial
+        # renderer, so large reports stay on the serial path.
+        if (settings.CUSTOMER_PDF_WORKERS > 1 and parallel_available()
+                and customers.count() <= settings.CUSTOMER_PDF_PARALLEL_MAX_RECORDS):
+            build_customers_report_parallel(customer_records(customers), spool,
+                                            workers=settings.CUSTOMER_PDF_WORKERS,
+                                            chunk_size=settings.CUSTOMER_PDF_CHUNK_SIZE)
+        else:
+            build_customers_report(customers.iterator(chunk_size=500), spool)
+    return spool
+
+
+@contextmanager
+def spool_file():
+    """A temporary file to write a download into, closed if writing fails."""
+    spool = tempfile.TemporaryFile()
+    try:
+        yield spool
+    except BaseException:
+        spool.close()
+        raise
+
+
+def spooled_response(spool, filename, content_type):
+    """Stream back everything written to ``spool``."""
+    size = spool.tell()
+    spool.seek(0)
+    response = FileResponse(spool, as_attachment=True, filename=filename, content_type=content_type)
+    response["Content-Length"] = size
+    return response
+
+
+def customers_pdf_response(spool):
+    return spooled_response(spool, "customers.pdf", "application/pdf")
+
+
+def customer_queryset(request):
+    """All customers matching the list view's filters, in list order.
+
+    The queryset is pinned to the database chosen for this request, so it
+    reads from the same place when a streaming response evaluates it later.
+    """
+    customers = Customer.objects.order_by('-created_at', '-id')
+    query = request.GET.get('q', '').strip()
+    if query:
+        customers = search_queryset(customers, query)
+    return customers.using(customers.db)
+
+
 @login_required
-def download_customer_pdf_individual(request, pk):
+@replica_reads
+def download_customers_csv(request):
     try:
-        customer = get_object_or_404(Customer, pk=pk)
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter,
-                                rightMargin=40, leftMargin=40, topMargin=60, bottomMargin=40)
-        styles = getSampleStyleSheet()
-        story = [Paragraph("<b>Customer Profile</b>", styles["Title"]), Spacer(1, 20)]
-
-        if customer.image:
-            try:
-                img = Image(customer.image.path, width=100, height=100)
-            except Exception:
-                img = Paragraph("No Image", styles["Normal"])
-        else:
-            img = Paragraph("No Image", styles["Normal"])
-
-        details = [
-            ["Name:", f"{customer.first_name} {customer.last_name}"],
-            ["Email:", customer.email or "—"],
-            ["Phone:", customer.phone or "—"],
-            ["Address:", f"{customer.city or ''}, {customer.state or ''}, {customer.country or ''}"],
-        ]
-        table = Table(details, colWidths=[80, 350])
-        table.setStyle(TableStyle([
-            ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
-            ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
-            ("VALIGN", (0, 0), (-1, -1), "TOP"),
-            ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
-        ]))
-
-        profile_row = Table([[img, table]], colWidths=[110, 400])
-        profile_row.setStyle(TableStyle([
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
-        ]))
-
-        story.append(profile_row)
-        story.append(Spacer(1, 20))
-
-        doc.build(story)
-        pdf = buffer.getvalue()
-        buffer.close()
-        response = HttpResponse(content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="customer_{customer.pk}.pdf"'
-        response.write(pdf)
+        rows = export_rows(customer_queryset(request))
+        response = StreamingHttpResponse(csv_chunks(rows), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = 'attachment; filename="customers.csv"'
         return response
+    except Exception as e:
+        return HttpResponse(f"Error exporting customers: {e}", status=500)
+
+
+@login_required
+@replica_reads
+def download_customers_xlsx(request):
+    try:
+        with spool_file() as spool:
+            write_xlsx(export_rows(customer_queryset(request)), spool)
+        return spooled_response(
+            spool, "customers.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    except Exception as e:
+        return HttpResponse(f"Error exporting customers: {e}", status=500)
+
+
+def customer_updated_at(request, pk):
+    return Customer.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+
+
+def customer_pdf_etag(request, pk):
+    updated_at = customer_updated_at(request, pk)
+    return profile_version(pk, updated_at) if updated_at else None
+
+
+@login_required
+@replica_reads
+@condition(etag_func=customer_pdf_etag, last_modified_func=customer_updated_at)
+def download_customer_pdf_individual(request, pk):
+    try:
+        customer = get_object_or_404(Customer.objects.select_related(*LOCATION_FIELDS), pk=pk)
+        return customer_pdf_response(customer, cached_profile_pdf(customer))
     except Exception as e:
         return HttpResponse(f"Error generating customer PDF: {e}", status=500)
 
 
+def customer_pdf_response(customer, file):
+    response = FileResponse(file, as_attachment=True,
+                            filename=f"customer_{customer.pk}.pdf", content_type="application/pdf")
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 # --- User Management ---
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_user_list_etag)
 def user_list(request):
     try:
         users = User.objects.all().order_by('-is_staff', 'username')
@@ -374,3 +602,15 @@ def user_delete(request, pk):
         return render(request, 'user_detail.html', {'users': users, 'confirm_delete': True})
     except Exception as e:
         return HttpResponse(f"Error deleting user: {e}", status=500)
+
+
+def metrics(request):
+    # Scraped by Prometheus rather than a logged-in user, which must send
+    # METRICS_TOKEN as a bearer token. Without a token the endpoint only
+    # exists under DEBUG.
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        raise Http404
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')